@@ -0,0 +1,138 @@
+"""
+Head to head lookups of two teams, the matches between them whichever side each team played on.
+
+Matches are found through ix_mfc_matches_team_pair_creation on (least(team1_id, team2_id), greatest(team1_id, team2_id),
+creation, id), so the pair filter and the keyset order of the match pages are both served by the index. Summaries are
+cached per pair in each worker, writes to a team's matches or elo forget the pairs of that team and every summary is
+reloaded once it's older than MAX_AGE so writes handled by other workers show up too.
+"""
+
+import time
+
+import sqlalchemy
+
+from sqlalchemy.dialects.postgresql import UUID
+
+from fastapi import HTTPException
+from fastapi import status
+
+from API.Database import BaseDB
+from API.Database.Models.Mordhau.Game.match import Match as ModelMatch
+from API.Database.Crud.Mordhau.Game.tree import build_match_trees
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import fetch_page
+
+from API.Schemas import Page as SchemaPage
+from API.Schemas.Mordhau.Game.match import MatchInDB as SchemaMatchInDB
+from API.Schemas.Mordhau.Game.match import HeadToHead as SchemaHeadToHead
+
+db = BaseDB.db
+
+MAX_AGE = 60
+
+_SUMMARY = """
+    WITH pair AS (
+        SELECT id, creation,
+            CASE WHEN team1_id = CAST(:team1_id AS uuid) THEN team1_rounds_won ELSE team2_rounds_won END
+                AS team1_rounds,
+            CASE WHEN team1_id = CAST(:team1_id AS uuid) THEN team2_rounds_won ELSE team1_rounds_won END
+                AS team2_rounds
+        FROM mfc_matches
+        WHERE least(team1_id, team2_id) = least(CAST(:team1_id AS uuid), CAST(:team2_id AS uuid))
+            AND greatest(team1_id, team2_id) = greatest(CAST(:team1_id AS uuid), CAST(:team2_id AS uuid))
+            AND team1_rounds_won + team2_rounds_won > 0
+    )
+    SELECT
+        count(*) AS matches_played,
+        count(*) FILTER (WHERE team1_rounds > team2_rounds) AS team1_wins,
+        count(*) FILTER (WHERE team2_rounds > team1_rounds) AS team2_wins,
+        count(*) FILTER (WHERE team1_rounds = team2_rounds) AS ties,
+        coalesce(sum(team1_rounds), 0) AS team1_rounds_won,
+        coalesce(sum(team2_rounds), 0) AS team2_rounds_won,
+        max(creation) AS last_played,
+        (
+            SELECT coalesce(sum(delta), 0) FROM mfc_elo_ledger JOIN pair ON pair.id = mfc_elo_ledger.match_id
+            WHERE mfc_elo_ledger.team_id = CAST(:team1_id AS uuid)
+        ) AS team1_elo_change,
+        (
+            SELECT coalesce(sum(delta), 0) FROM mfc_elo_ledger JOIN pair ON pair.id = mfc_elo_ledger.match_id
+            WHERE mfc_elo_ledger.team_id = CAST(:team2_id AS uuid)
+        ) AS team2_elo_change
+    FROM pair
+"""
+
+_summaries: dict[tuple[str, str], tuple[float, SchemaHeadToHead]] = {}
+# Bumped by forget_head_to_head, a summary loaded while it changed may be stale and isn't cached
+_generation = 0
+
+
+def _team_pair(team1_id, team2_id) -> tuple[str, str]:
+    if str(team1_id) == str(team2_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A head to head needs two different teams"
+        )
+    return str(team1_id), str(team2_id)
+
+
+def pair_filter(team1_id, team2_id) -> sqlalchemy.sql.ColumnElement:
+    """
+    Returns:
+        A where clause matching the matches between the two teams, on either side, that uses the team pair index
+    """
+
+    pair = [sqlalchemy.cast(team_id, UUID) for team_id in _team_pair(team1_id, team2_id)]
+    return sqlalchemy.and_(
+        sqlalchemy.func.least(ModelMatch.team1_id, ModelMatch.team2_id) == sqlalchemy.func.least(*pair),
+        sqlalchemy.func.greatest(ModelMatch.team1_id, ModelMatch.team2_id) == sqlalchemy.func.greatest(*pair)
+    )
+
+
+def forget_head_to_head(*team_ids) -> None:
+    """
+    Drops the cached summaries of every pair with one of the given teams, called whenever their matches or elo change
+    """
+
+    global _generation
+
+    _generation += 1
+    team_ids = {str(team_id) for team_id in team_ids if team_id is not None}
+    for pair in [pair for pair in _summaries if team_ids.intersection(pair)]:
+        del _summaries[pair]
+
+
+async def get_head_to_head_page(team1_id, team2_id, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> \
+        SchemaPage[SchemaMatchInDB]:
+    query: ModelMatch.__table__.select = ModelMatch.__table__.select().where(pair_filter(team1_id, team2_id))
+
+    matches, next_cursor, _ = await fetch_page(ModelMatch, cursor=cursor, limit=limit, query=query)
+
+    # The estimate of the whole table says nothing about the pair
+    return SchemaPage[SchemaMatchInDB](
+        items=await build_match_trees(matches),
+        next_cursor=next_cursor,
+        estimated_total=None
+    )
+
+
+async def get_head_to_head(team1_id, team2_id) -> SchemaHeadToHead:
+    """
+    Returns:
+        The matches, match wins and rounds of both teams against each other, when they last played and the elo they
+        gained from it, from the point of view of the order the teams were given in. Matches without any rounds won
+        haven't been played yet and aren't counted.
+    """
+
+    pair = _team_pair(team1_id, team2_id)
+
+    if (cached := _summaries.get(pair)) and time.monotonic() - cached[0] <= MAX_AGE:
+        return cached[1]
+
+    query = sqlalchemy.text(_SUMMARY).bindparams(team1_id=pair[0], team2_id=pair[1])
+
+    generation = _generation
+    loaded_at = time.monotonic()
+    summary = SchemaHeadToHead(team1_id=pair[0], team2_id=pair[1], **dict(await db.fetch_one(query)))
+    if generation == _generation:
+        _summaries[pair] = (loaded_at, summary)
+    return summary
@@ -0,0 +1,156 @@
+"""
+Per-map aggregates of sets, who won a set is decided by its round counters. Only decided sets are counted, a set where
+both teams won as many rounds is still being played.
+
+The aggregates are cached per map in each worker. Creating a set or round marks its map dirty and the next lookup
+reloads only the dirty maps with one grouped query, every map is reloaded once the cache is older than MAX_AGE so
+writes handled by other workers show up too.
+"""
+
+import time
+
+import sqlalchemy
+
+from fastapi import HTTPException
+from fastapi import status
+
+from API.Database import BaseDB
+
+from API.Schemas.Mordhau.Game.set import MapStats as SchemaMapStats
+from API.Schemas.Mordhau.Game.set import MapMatrix as SchemaMapMatrix
+from API.Schemas.Mordhau.Game.set import TeamMapStats as SchemaTeamMapStats
+
+db = BaseDB.db
+
+MAX_AGE = 60
+
+_SIDES = """
+    SELECT mfc_sets.map, sides.team_id, count(*) AS sets_played, count(*) FILTER (WHERE sides.won) AS sets_won
+    FROM mfc_sets
+    JOIN mfc_matches ON mfc_matches.id = mfc_sets.match_id
+    CROSS JOIN LATERAL (VALUES
+        (mfc_matches.team1_id, mfc_sets.team1_rounds_won > mfc_sets.team2_rounds_won),
+        (mfc_matches.team2_id, mfc_sets.team2_rounds_won > mfc_sets.team1_rounds_won)
+    ) AS sides(team_id, won)
+    WHERE sides.team_id IS NOT NULL AND mfc_sets.team1_rounds_won != mfc_sets.team2_rounds_won
+"""
+
+_MAPS = """
+    SELECT map, count(*) AS sets_played
+    FROM mfc_sets
+    WHERE team1_rounds_won != team2_rounds_won
+"""
+
+_map_stats: dict[str, SchemaMapStats] = {}
+_dirty: set[str] = set()
+_loaded_at: float = None
+
+
+def mark_map_dirty(*map_names: str) -> None:
+    """
+    Has the next lookup reload the given maps, called whenever a set or round is created
+    """
+
+    _dirty.update(map_name.casefold() for map_name in map_names)
+
+
+async def _load(map_names: list[str] = None) -> dict[str, SchemaMapStats]:
+    sides = _SIDES
+    maps = _MAPS
+    params = {}
+    if map_names is not None:
+        sides += " AND mfc_sets.map = ANY(CAST(:map_names AS text[]))"
+        maps += " AND map = ANY(CAST(:map_names AS text[]))"
+        params["map_names"] = list(map_names)
+
+    query = sqlalchemy.text(sides + " GROUP BY mfc_sets.map, sides.team_id").bindparams(**params)
+
+    teams = {}
+    for row in await db.fetch_all(query):
+        teams.setdefault(row["map"], []).append(SchemaTeamMapStats(
+            team_id=row["team_id"],
+            sets_played=row["sets_played"],
+            sets_won=row["sets_won"],
+            win_rate=row["sets_won"] / row["sets_played"]
+        ))
+
+    query = sqlalchemy.text(maps + " GROUP BY map").bindparams(**params)
+
+    return {
+        row["map"]: SchemaMapStats(
+            map=row["map"],
+            sets_played=row["sets_played"],
+            teams=sorted(teams.get(row["map"], []), key=lambda team: team.win_rate, reverse=True)
+        )
+        for row in await db.fetch_all(query)
+    }
+
+
+async def _refresh() -> None:
+    """
+    Reloads the cache when it's too old, or only its dirty maps. The new stats are swapped in once they're loaded, so
+    lookups during the reload still see the old ones and a failed reload leaves the cache and the dirty maps as they
+    were. Maps marked dirty during the reload stay dirty.
+    """
+
+    global _map_stats, _loaded_at
+
+    started = time.monotonic()
+    dirty = set(_dirty)
+
+    if _loaded_at is None or started - _loaded_at > MAX_AGE:
+        _map_stats = await _load()
+        _loaded_at = started
+    elif dirty:
+        stats = await _load(list(dirty))
+        _map_stats = {
+            **{map_name: stats for map_name, stats in _map_stats.items() if map_name not in dirty},
+            **stats
+        }
+    else:
+        return
+
+    _dirty.difference_update(dirty)
+
+
+async def get_map_stats(map_name: str = None) -> list[SchemaMapStats]:
+    """
+    Returns:
+        The sets played on every map, or only the given map, and the sets every team played and won on it. Raises a 404
+        for maps without decided sets.
+    """
+
+    await _refresh()
+
+    if map_name is None:
+        return sorted(_map_stats.values(), key=lambda stats: stats.sets_played, reverse=True)
+
+    if not (stats := _map_stats.get(map_name.casefold())):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No sets were played on map: {map_name}"
+        )
+    return [stats]
+
+
+async def get_map_matrix() -> SchemaMapMatrix:
+    """
+    Returns:
+        The sets played and set win rate of every team (rows) on every map (columns), None where a team never played
+        the map
+    """
+
+    await _refresh()
+
+    maps = sorted(_map_stats)
+    team_ids = sorted({str(team.team_id) for stats in _map_stats.values() for team in stats.teams})
+    team_index = {team_id: index for index, team_id in enumerate(team_ids)}
+
+    sets_played = [[0] * len(maps) for _ in team_ids]
+    win_rates = [[None] * len(maps) for _ in team_ids]
+    for column, map_name in enumerate(maps):
+        for team in _map_stats[map_name].teams:
+            sets_played[team_index[str(team.team_id)]][column] = team.sets_played
+            win_rates[team_index[str(team.team_id)]][column] = team.win_rate
+
+    return SchemaMapMatrix(maps=maps, team_ids=team_ids, sets_played=sets_played, win_rates=win_rates)
@@ -1,22 +1,50 @@
+import asyncio
 import datetime
 
+from typing import AsyncIterator
+
+import sqlalchemy
+
 from fastapi import HTTPException
 from fastapi import status
 
 from asyncpg import DataError
+from asyncpg import ForeignKeyViolationError
 
 from API.Database import BaseDB
 from API.Database.Models.Mordhau.Game.match import Match as ModelMatch
-from API.Database.Crud.Mordhau.Game.set import get_sets_by_match_id
+from API.Database.Models.Mordhau.Game.set import Set as ModelSet
+from API.Database.Models.Mordhau.Game.round import Round as ModelRound
+from API.Database.Models.Mordhau.Game.round import RoundPlayer as ModelRoundPlayer
+from API.Database.Models.Mordhau.elo import EloLedger as ModelEloLedger
+from API.Database.Crud.Mordhau.Game.tree import build_match_trees
+from API.Database.Crud.Mordhau.Game.map_stats import mark_map_dirty
+from API.Database.Crud.Mordhau.Game.head_to_head import forget_head_to_head
+from API.Database.Crud.Mordhau.Game.head_to_head import pair_filter
+from API.Database.Crud import any_of
+from API.Database.Crud import in_order
+from API.Database.Crud import with_ids
+from API.Database.Crud import iterate_ndjson
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import fetch_page
 
 # Elo calculation related imports
 from API.Database.Crud.Mordhau.team import get_team_by_id
 from API.Database.Crud.Mordhau.team import update_elo
+from API.Database.Crud.Mordhau.team import get_team_elos
+from API.Database.Crud.Mordhau.team import sync_leaderboard
+from API.Database.Crud.Mordhau.player import update_player_stats
+from API.Database.Crud.Mordhau.elo import ledger_entry
+from API.Database.Crud.Mordhau.elo import create_ledger_entries
+from API.Database.Crud.Mordhau.elo import replay_elo_from
 from API.ELO.team import Team as ELOTeam
 from API.ELO import ELO
 
+from API.Schemas import Page as SchemaPage
 from API.Schemas.Mordhau.Game.match import MatchInDB as SchemaMatchInDB
+from API.Schemas.Mordhau.Game.match import BaseMatchInDB as SchemaBaseMatchInDB
 from API.Schemas.Mordhau.Game.match import Match as SchemaMatch
+from API.Schemas.Mordhau.Game.match import IngestMatch as SchemaIngestMatch
 
 db = BaseDB.db
 
@@ -39,30 +67,12 @@ async def get_match(
         result = await db.fetch_one(query)
         if not result:
             return None
+        return (await build_match_trees([result]))[0]
     else:
         result = await db.fetch_all(query)
         if not result:
             return []
-
-    if fetch_one:
-        match = dict(result)
-        sets = await get_sets_by_match_id(match["id"])
-        return SchemaMatchInDB(
-            **match,
-            sets=sets
-        )
-    else:
-        matches = []
-        for _match in result:
-            single_match = dict(_match)
-            sets = await get_sets_by_match_id(single_match["id"])
-            matches.append(
-                SchemaMatchInDB(
-                    **single_match,
-                    sets=sets
-                )
-            )
-        return matches
+        return await build_match_trees(result)
 
 
 async def get_match_by_id(match_id) -> SchemaMatchInDB:
@@ -76,18 +86,22 @@ async def get_match_by_id(match_id) -> SchemaMatchInDB:
 
 
 async def get_matches_by_team_ids(team1_id, team2_id) -> [SchemaMatchInDB]:
+    """
+    Returns:
+        Every match between the two teams whichever side each played on, oldest first
+    """
+
     query: ModelMatch.__table__.select = ModelMatch.__table__.select().where(
-        ModelMatch.team1_id == team1_id,
-        ModelMatch.team2_id == team2_id
-    )
+        pair_filter(team1_id, team2_id)
+    ).order_by(ModelMatch.creation, ModelMatch.id)
     return await get_match(query=query, fetch_one=False)
 
 
 async def get_matches_by_team_id(team_id) -> [SchemaMatchInDB]:
-    if result := await get_match(match_schema=ModelMatch.team1_id, match_str=team_id, fetch_one=False):
-        return result
-    else:
-        return await get_match(match_schema=ModelMatch.team2_id, match_str=team_id, fetch_one=False)
+    query: ModelMatch.__table__.select = ModelMatch.__table__.select().where(
+        sqlalchemy.or_(ModelMatch.team1_id == team_id, ModelMatch.team2_id == team_id)
+    ).order_by(ModelMatch.creation, ModelMatch.id)
+    return await get_match(query=query, fetch_one=False)
 
 
 async def get_matches(start_time: datetime.datetime = None, end_time: datetime.datetime = None) -> \
@@ -103,6 +117,31 @@ async def get_matches(start_time: datetime.datetime = None, end_time: datetime.d
     return await get_match(query=query, fetch_one=False)
 
 
+def export_matches(start_time: datetime.datetime = None, end_time: datetime.datetime = None) -> AsyncIterator[bytes]:
+    """
+    Returns:
+        The rows of mfc_matches, oldest first, streamed as newline delimited JSON
+    """
+
+    query: ModelMatch.__table__.select = ModelMatch.__table__.select()
+    if start_time:
+        query = query.where(ModelMatch.creation >= start_time)
+    if end_time:
+        query = query.where(ModelMatch.creation <= end_time)
+
+    return iterate_ndjson(query.order_by(ModelMatch.creation, ModelMatch.id))
+
+
+async def get_matches_page(cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> SchemaPage[SchemaMatchInDB]:
+    matches, next_cursor, estimated_total = await fetch_page(ModelMatch, cursor=cursor, limit=limit)
+
+    return SchemaPage[SchemaMatchInDB](
+        items=await build_match_trees(matches),
+        next_cursor=next_cursor,
+        estimated_total=estimated_total
+    )
+
+
 async def create_match(match: SchemaMatch):
     query: ModelMatch.__table__.insert = ModelMatch.__table__.insert().values(
         team1_id=match.team1_id,
@@ -110,48 +149,196 @@ async def create_match(match: SchemaMatch):
         elo_calculated=False
     )
 
-    return await db.execute(query)
+    match_id = await db.execute(query)
+    forget_head_to_head(match.team1_id, match.team2_id)
+    return match_id
 
 
 async def calculate_elo(match_id) -> [dict[str, float], str]:
-    match = await get_match(match_schema=ModelMatch.id, match_str=match_id, fetch_one=True)
-    if not match:
+    # Only the match row, its round counters are all the sets and rounds are needed for
+    query: ModelMatch.__table__.select = ModelMatch.__table__.select().where(ModelMatch.id == match_id)
+    if not (match := await db.fetch_one(query)):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Could not find match with id {match_id}"
         )
+    match = SchemaBaseMatchInDB(**dict(match))
+
+    # Gathered so both teams are loaded with one query
+    team1, team2 = await asyncio.gather(get_team_by_id(match.team1_id), get_team_by_id(match.team2_id))
+
+    team1_elo = ELOTeam(elo=team1.elo, rounds_won=match.team1_rounds_won)
+    team2_elo = ELOTeam(elo=team2.elo, rounds_won=match.team2_rounds_won)
 
-    team1 = await get_team_by_id(match.team1_id)
-    team2 = await get_team_by_id(match.team2_id)
-    
-    team1_rounds_won = 0
-    team2_rounds_won = 0
-    
-    for set in match.sets:
-        for _round in set.rounds:
-            if _round.team1_win:
-                team1_rounds_won += 1
-            else:
-                team2_rounds_won += 1
-    
-    team1_elo = ELOTeam(elo=team1.elo, rounds_won=team1_rounds_won)
-    team2_elo = ELOTeam(elo=team2.elo, rounds_won=team2_rounds_won)
-
-    if team1_rounds_won != team2_rounds_won:
+    if match.team1_rounds_won != match.team2_rounds_won:
         new_elo = ELO().calculate(team1_elo, team2_elo)
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Unable to calculate elo, scores were the same!"
         )
-    
-    await update_elo(match.team1_id, round(new_elo["team1"]))
-    await update_elo(match.team2_id, round(new_elo["team2"]))
+
+    # The ledger rows of the match carry its creation, if either team's elo changed after the match was played the
+    # history is replayed from the match so the ledger stays in order
+    query: ModelEloLedger.__table__.select = sqlalchemy.select([ModelEloLedger.id]).where(
+        any_of(ModelEloLedger.team_id, [match.team1_id, match.team2_id])
+    ).where(
+        ModelEloLedger.creation > match.creation
+    ).limit(1)
+
+    if await db.fetch_val(query) is not None:
+        await replay_elo_from(match.id)
+
+        query: ModelEloLedger.__table__.select = sqlalchemy.select([
+            ModelEloLedger.team_id, ModelEloLedger.elo_after
+        ]).where(ModelEloLedger.match_id == match.id)
+        elos = {str(entry["team_id"]): entry["elo_after"] for entry in await db.fetch_all(query)}
+
+        return {"team1": elos[str(match.team1_id)], "team2": elos[str(match.team2_id)]}
 
     query: ModelMatch.__table__.update = ModelMatch.__table__.update().where(
         ModelMatch.id == match_id,
     ).values(elo_calculated=True)
 
-    await db.execute(query)
+    async with db.transaction():
+        await update_elo(match.team1_id, round(new_elo["team1"]))
+        await update_elo(match.team2_id, round(new_elo["team2"]))
+
+        await create_ledger_entries([
+            ledger_entry(match.team1_id, team1.elo, round(new_elo["team1"]),
+                         match_id=match.id, creation=match.creation),
+            ledger_entry(match.team2_id, team2.elo, round(new_elo["team2"]),
+                         match_id=match.id, creation=match.creation)
+        ])
+
+        await db.execute(query)
+
+    await sync_leaderboard()
+    return new_elo
+
+
+def _check_ingest(match: SchemaIngestMatch) -> None:
+    team_ids = {str(match.team1_id), str(match.team2_id)}
+    if len(team_ids) != 2:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A team can't play against itself")
+
+    for _set in match.sets:
+        for _round in _set.rounds:
+            player_ids = set()
+            for round_player in _round.round_players:
+                if str(round_player.team_id) not in team_ids:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Team {round_player.team_id} of player {round_player.player_id} isn't in the match"
+                    )
+                # Team number 0 is team 1, the round wins of the player are read from it
+                if (round_player.team_number == 0) != (str(round_player.team_id) == str(match.team1_id)):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Team number {round_player.team_number} of player {round_player.player_id} doesn't "
+                               f"match team {round_player.team_id}"
+                    )
+                if str(round_player.player_id) in player_ids:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Player {round_player.player_id} is given more than once for a round on {_set.map}"
+                    )
+                player_ids.add(str(round_player.player_id))
+
+
+async def _insert_all(model, values: list[dict]) -> list:
+    if not values:
+        return []
+
+    ids = with_ids(values)
+    await db.execute(model.__table__.insert().values(in_order(values)))
+
+    return ids
+
+
+async def ingest_match(match: SchemaIngestMatch, calculate: bool = False) -> [str, dict[str, float]]:
+    """
+    Creates a match with all of its sets, rounds and round players in one transaction, each level with a single
+    multi-row INSERT. Nothing is created if any of it fails.
+
+    Args:
+        match: The whole match
+        calculate: If the elo of both teams is calculated from the match once it's created
+
+    Returns:
+        The id of the match and the new elo of both teams, None if it wasn't calculated
+    """
+
+    _check_ingest(match)
+
+    set_counts = [
+        (
+            sum(_round.team1_win for _round in _set.rounds),
+            sum(not _round.team1_win for _round in _set.rounds)
+        )
+        for _set in match.sets
+    ]
+
+    async with db.transaction():
+        # Raises a 404 for unknown teams
+        await get_team_elos([match.team1_id, match.team2_id])
+
+        try:
+            match_id = await db.execute(ModelMatch.__table__.insert().values(
+                team1_id=str(match.team1_id),
+                team2_id=str(match.team2_id),
+                elo_calculated=False,
+                team1_rounds_won=sum(team1_rounds_won for team1_rounds_won, _ in set_counts),
+                team2_rounds_won=sum(team2_rounds_won for _, team2_rounds_won in set_counts)
+            ))
+
+            set_ids = await _insert_all(ModelSet, [
+                {
+                    "map": _set.map.casefold(),
+                    "match_id": match_id,
+                    "team1_rounds_won": team1_rounds_won,
+                    "team2_rounds_won": team2_rounds_won
+                }
+                for _set, (team1_rounds_won, team2_rounds_won) in zip(match.sets, set_counts)
+            ])
+
+            rounds = [(set_id, _round) for set_id, _set in zip(set_ids, match.sets) for _round in _set.rounds]
+            round_ids = await _insert_all(ModelRound, [
+                {
+                    "team1_win": _round.team1_win,
+                    "team2_win": _round.team2_win,
+                    "set_id": set_id,
+                    "match_id": match_id
+                }
+                for set_id, _round in rounds
+            ])
+
+            round_player_ids = await _insert_all(ModelRoundPlayer, [
+                {
+                    "score": round_player.score,
+                    "kills": round_player.kills,
+                    "deaths": round_player.deaths,
+                    "assists": round_player.assists,
+                    "team_number": round_player.team_number,
+                    "team_id": str(round_player.team_id),
+                    "player_id": str(round_player.player_id),
+                    "round_id": round_id,
+                    "set_id": set_id,
+                    "match_id": match_id
+                }
+                for round_id, (set_id, _round) in zip(round_ids, rounds)
+                for round_player in _round.round_players
+            ])
+            await update_player_stats(round_player_ids)
+        except (DataError, ForeignKeyViolationError) as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(error)
+            )
+
+        new_elo = await calculate_elo(match_id) if calculate else None
 
-    return new_elo
\ No newline at end of file
+    await sync_leaderboard()
+    mark_map_dirty(*(_set.map for _set in match.sets))
+    forget_head_to_head(match.team1_id, match.team2_id)
+    return match_id, new_elo
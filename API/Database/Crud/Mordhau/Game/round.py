@@ -1,13 +1,22 @@
+import sqlalchemy
+
 from fastapi import HTTPException
 from fastapi import status
 
 from asyncpg import DataError
 
 from API.Database import BaseDB
+from API.Database.Models.Mordhau.Game.match import Match as ModelMatch
+from API.Database.Models.Mordhau.Game.set import Set as ModelSet
 from API.Database.Models.Mordhau.Game.round import Round as ModelRound
 
-from API.Database.Crud.Mordhau.Game.set import get_set_by_id
+from API.Database.Crud.Mordhau.Game.tree import build_round_trees
+from API.Database.Crud.Mordhau.Game.map_stats import mark_map_dirty
+from API.Database.Crud.Mordhau.Game.head_to_head import forget_head_to_head
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import fetch_page
 
+from API.Schemas import Page as SchemaPage
 from API.Schemas.Mordhau.Game.round import RoundInDB as SchemaRoundInDB
 from API.Schemas.Mordhau.Game.round import Round as SchemaRound
 
@@ -16,22 +25,6 @@ from API.Schemas.Mordhau.Game.round import RoundPlayerInDB as SchemaRoundPlayerI
 db = BaseDB.db
 
 
-def parse_rounds(round_players: list[SchemaRoundPlayerInDB]) -> \
-        [list[SchemaRoundPlayerInDB], list[SchemaRoundPlayerInDB]]:
-    team1 = []
-    team2 = []
-
-    if not round_players:
-        return [], []
-    for round_player in round_players:
-        if round_player.team_number == 0:
-            team1.append(round_player)
-        else:
-            team2.append(round_player)
-
-    return team1, team2
-
-
 async def get_round(
         match_schema=None,
         match_str=None,
@@ -49,37 +42,12 @@ async def get_round(
         result = await db.fetch_one(query)
         if not result:
             return None
+        return (await build_round_trees([result]))[0]
     else:
         result = await db.fetch_all(query)
         if not result:
             return []
-
-    from API.Database.Crud.Mordhau.Game.round_player import get_round_players_by_round_id
-
-    if fetch_one:
-        round= dict(result)
-        round_players = await get_round_players_by_round_id(round["id"])
-        team1_players, team2_players = parse_rounds(round_players)
-
-        return SchemaRoundInDB(
-            **round,
-            team1_players=team1_players,
-            team2_players=team2_players
-        )
-    else:
-        rounds = []
-        for _round in result:
-            single_round = dict(_round)
-            round_players = await get_round_players_by_round_id(single_round["id"])
-            team1_players, team2_players = parse_rounds(round_players)
-            rounds.append(
-                SchemaRoundInDB(
-                    **single_round,
-                    team1_players=team1_players,
-                    team2_players=team2_players
-                )
-            )
-        return rounds
+        return await build_round_trees(result)
 
 
 async def get_round_by_id(round_id) -> SchemaRoundInDB:
@@ -108,17 +76,61 @@ async def get_rounds() -> list[SchemaRoundPlayerInDB]:
     return await get_round(query=query, fetch_one=False)
 
 
+async def get_rounds_page(cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> SchemaPage[SchemaRoundInDB]:
+    rounds, next_cursor, estimated_total = await fetch_page(ModelRound, cursor=cursor, limit=limit)
+
+    return SchemaPage[SchemaRoundInDB](
+        items=await build_round_trees(rounds),
+        next_cursor=next_cursor,
+        estimated_total=estimated_total
+    )
+
+
 async def create_round(round: SchemaRound):
-    set = await get_set_by_id(round.set_id)
+    query = sqlalchemy.select([ModelSet.match_id, ModelSet.map]).where(ModelSet.id == round.set_id)
+
+    try:
+        set = await db.fetch_one(query)
+    except DataError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid UUID given"
+        )
+    if not set:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Could not find set: {round.set_id}"
+        )
 
     query: ModelRound.__table__.insert = ModelRound.__table__.insert().values(
         set_id=round.set_id,
-        match_id=set.match_id,
+        match_id=set["match_id"],
         team1_win=round.team1_win,
         team2_win=round.team2_win
     )
 
-    return await db.execute(query)
+    team1_rounds_won = int(round.team1_win)
+    team2_rounds_won = int(not round.team1_win)
+
+    async with db.transaction():
+        round_id = await db.execute(query)
+
+        await db.execute(ModelSet.__table__.update().where(
+            ModelSet.id == round.set_id
+        ).values(
+            team1_rounds_won=ModelSet.team1_rounds_won + team1_rounds_won,
+            team2_rounds_won=ModelSet.team2_rounds_won + team2_rounds_won
+        ))
+        match = await db.fetch_one(ModelMatch.__table__.update().where(
+            ModelMatch.id == set["match_id"]
+        ).values(
+            team1_rounds_won=ModelMatch.team1_rounds_won + team1_rounds_won,
+            team2_rounds_won=ModelMatch.team2_rounds_won + team2_rounds_won
+        ).returning(ModelMatch.team1_id, ModelMatch.team2_id))
+
+    mark_map_dirty(set["map"])
+    forget_head_to_head(match["team1_id"], match["team2_id"])
+    return round_id
 
 
 
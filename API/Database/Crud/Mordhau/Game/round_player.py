@@ -1,13 +1,27 @@
+from typing import AsyncIterator
+
+import sqlalchemy
+
 from fastapi import HTTPException
 from fastapi import status
 
 from pydantic import UUID4
 from asyncpg import DataError
+from asyncpg import ForeignKeyViolationError
 
 from API.Database import BaseDB
+from API.Database.Crud import any_of
+from API.Database.Crud import in_order
+from API.Database.Crud import with_ids
+from API.Database.Crud import iterate_ndjson
 from API.Database.Crud.Mordhau.Game.round import get_round_by_id
+from API.Database.Crud.Mordhau.player import update_player_stats
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import fetch_page
+from API.Database.Models.Mordhau.Game.round import Round as ModelRound
 from API.Database.Models.Mordhau.Game.round import RoundPlayer as ModelRoundPlayer
 
+from API.Schemas import Page as SchemaPage
 from API.Schemas.Mordhau.Game.round import RoundPlayerInDB as SchemaRoundPlayerInDB
 from API.Schemas.Mordhau.Game.round import CreateRoundPlayer as SchemaCreateRoundPlayer
 from API.Schemas.Mordhau.Game.round import CreateRoundPlayers as SchemaCreateRoundPlayers
@@ -88,6 +102,30 @@ async def get_round_players() -> list[SchemaRoundPlayerInDB]:
     return await get_round_player(query=query, fetch_one=False)
 
 
+def export_round_players() -> AsyncIterator[bytes]:
+    """
+    Returns:
+        The rows of mfc_round_players, oldest first, streamed as newline delimited JSON
+    """
+
+    query: ModelRoundPlayer.__table__.select = ModelRoundPlayer.__table__.select().order_by(
+        ModelRoundPlayer.creation, ModelRoundPlayer.id
+    )
+
+    return iterate_ndjson(query)
+
+
+async def get_round_players_page(cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> \
+        SchemaPage[SchemaRoundPlayerInDB]:
+    round_players, next_cursor, estimated_total = await fetch_page(ModelRoundPlayer, cursor=cursor, limit=limit)
+
+    return SchemaPage[SchemaRoundPlayerInDB](
+        items=[SchemaRoundPlayerInDB(**dict(round_player)) for round_player in round_players],
+        next_cursor=next_cursor,
+        estimated_total=estimated_total
+    )
+
+
 async def get_round_player_by_player(player_id: UUID4) -> list[SchemaRoundPlayerInDB]:
     return await get_round_player(ModelRoundPlayer.player_id, player_id, fetch_one=False)
 
@@ -110,18 +148,79 @@ async def create_round_player(round_player: SchemaCreateRoundPlayer) -> UUID4:
     )
 
     try:
-        return await db.execute(query)
-    except DataError as error:
+        async with db.transaction():
+            round_player_id = await db.execute(query)
+            await update_player_stats([round_player_id])
+            return round_player_id
+    except (DataError, ForeignKeyViolationError) as error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(error)
         )
 
 
-async def create_all_round_players(round_all: SchemaCreateRoundPlayers):
-    player_ids = []
-    for player in round_all.round_players:
-        print(player)
-        player_ids.append(await create_round_player(player))
+async def create_all_round_players(round_all: SchemaCreateRoundPlayers) -> list[UUID4]:
+    """
+    Creates every round player with one multi-row INSERT, the rounds they belong to are resolved with one query
+
+    Returns:
+        The ids of the created round players, in the order they were given
+    """
+
+    if not round_all.round_players:
+        return []
+
+    query = sqlalchemy.select([ModelRound.id, ModelRound.set_id, ModelRound.match_id]).where(
+        any_of(ModelRound.id, {str(round_player.round_id) for round_player in round_all.round_players})
+    )
+
+    try:
+        rounds = {str(_round["id"]): _round for _round in await db.fetch_all(query)}
+    except DataError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid UUID given"
+        )
 
-    return player_ids
+    values = []
+    seen = set()
+    for round_player in round_all.round_players:
+        if not (_round := rounds.get(str(round_player.round_id))):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Could not find round: {round_player.round_id}"
+            )
+        if (key := (str(round_player.round_id), str(round_player.player_id))) in seen:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Player {round_player.player_id} is given more than once for round {round_player.round_id}"
+            )
+        seen.add(key)
+
+        values.append({
+            "score": round_player.score,
+            "kills": round_player.kills,
+            "deaths": round_player.deaths,
+            "assists": round_player.assists,
+            "team_number": round_player.team_number,
+            "team_id": str(round_player.team_id),
+            "player_id": str(round_player.player_id),
+            "round_id": str(round_player.round_id),
+            "set_id": str(_round["set_id"]),
+            "match_id": str(_round["match_id"])
+        })
+
+    # Either every round player is created and counted in the player stats or none are
+    round_player_ids = with_ids(values)
+    query: ModelRoundPlayer.__table__.insert = ModelRoundPlayer.__table__.insert().values(in_order(values))
+
+    try:
+        async with db.transaction():
+            await db.execute(query)
+            await update_player_stats(round_player_ids)
+            return round_player_ids
+    except (DataError, ForeignKeyViolationError) as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error)
+        )
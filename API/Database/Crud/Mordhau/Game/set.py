@@ -5,7 +5,12 @@ from asyncpg import DataError
 
 from API.Database import BaseDB
 from API.Database.Models.Mordhau.Game.set import Set as ModelSet
+from API.Database.Crud.Mordhau.Game.tree import build_set_trees
+from API.Database.Crud.Mordhau.Game.map_stats import mark_map_dirty
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import fetch_page
 
+from API.Schemas import Page as SchemaPage
 from API.Schemas.Mordhau.Game.set import SetInDB as SchemaSetInDB
 from API.Schemas.Mordhau.Game.set import Set as SchemaSet
 
@@ -29,32 +34,12 @@ async def get_set(
         result = await db.fetch_one(query)
         if not result:
             return None
+        return (await build_set_trees([result]))[0]
     else:
         result = await db.fetch_all(query)
         if not result:
             return []
-
-    from API.Database.Crud.Mordhau.Game.round import get_rounds_by_set_id
-
-    if fetch_one:
-        set = dict(result)
-        rounds = await get_rounds_by_set_id(set["id"])
-        return SchemaSetInDB(
-            **set,
-            rounds=rounds
-        )
-    else:
-        sets = []
-        for _set in result:
-            set = dict(_set)
-            rounds = await get_rounds_by_set_id(set["id"])
-            sets.append(
-                SchemaSetInDB(
-                    **set,
-                    rounds=rounds
-                )
-            )
-        return sets
+        return await build_set_trees(result)
 
 
 async def get_set_by_id(set_id) -> SchemaSetInDB:
@@ -77,7 +62,7 @@ async def get_sets_by_match_id(match_id) -> list[SchemaSetInDB]:
 
 
 async def get_sets_by_map(map_name: str) -> list[SchemaSetInDB]:
-    return await get_set(ModelSet.map, map_name.casefold(), fetch_one=True)
+    return await get_set(ModelSet.map, map_name.casefold(), fetch_one=False)
 
 
 async def get_sets() -> list[SchemaSetInDB]:
@@ -86,10 +71,22 @@ async def get_sets() -> list[SchemaSetInDB]:
     return await get_set(query=query, fetch_one=False)
 
 
+async def get_sets_page(cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> SchemaPage[SchemaSetInDB]:
+    sets, next_cursor, estimated_total = await fetch_page(ModelSet, cursor=cursor, limit=limit)
+
+    return SchemaPage[SchemaSetInDB](
+        items=await build_set_trees(sets),
+        next_cursor=next_cursor,
+        estimated_total=estimated_total
+    )
+
+
 async def create_set(set: SchemaSet):
     query: ModelSet.__table__.insert = ModelSet.__table__.insert().values(
         map=set.map.casefold(),
         match_id=set.match_id
     )
 
-    return await db.execute(query)
+    set_id = await db.execute(query)
+    mark_map_dirty(set.map)
+    return set_id
@@ -0,0 +1,277 @@
+"""
+Builds match, set and round trees with one query per level for every row at that level, the children are joined to
+their parents in memory. match_trees_json instead has Postgres build the MatchInDB JSON itself.
+"""
+
+import datetime
+
+from typing import AsyncIterator
+from typing import Mapping
+
+import sqlalchemy
+
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from API.Database import BaseDB
+from API.Database.Crud import any_of
+from API.Database.partitions import PARTITION_ROUNDS
+from API.Database.partitions import PARTITIONED_TABLES
+from API.Database.Models.Mordhau.Game.match import Match as ModelMatch
+from API.Database.Models.Mordhau.Game.set import Set as ModelSet
+from API.Database.Models.Mordhau.Game.round import Round as ModelRound
+from API.Database.Models.Mordhau.Game.round import RoundPlayer as ModelRoundPlayer
+
+from API.Schemas.Mordhau.Game.match import MatchInDB as SchemaMatchInDB
+from API.Schemas.Mordhau.Game.set import SetInDB as SchemaSetInDB
+from API.Schemas.Mordhau.Game.round import RoundInDB as SchemaRoundInDB
+from API.Schemas.Mordhau.Game.round import RoundPlayerInDB as SchemaRoundPlayerInDB
+
+db = BaseDB.db
+
+
+def parse_rounds(round_players: list[SchemaRoundPlayerInDB]) -> \
+        [list[SchemaRoundPlayerInDB], list[SchemaRoundPlayerInDB]]:
+    team1 = []
+    team2 = []
+
+    if not round_players:
+        return [], []
+    for round_player in round_players:
+        if round_player.team_number == 0:
+            team1.append(round_player)
+        else:
+            team2.append(round_player)
+
+    return team1, team2
+
+
+def _group(rows: list[Mapping], key: str) -> dict[str, list[dict]]:
+    groups = {}
+    for row in rows:
+        row = dict(row)
+        groups.setdefault(str(row[key]), []).append(row)
+    return groups
+
+
+def _partitioned(model) -> bool:
+    return PARTITION_ROUNDS and model.__table__.name in PARTITIONED_TABLES
+
+
+def _created_after(model, parent_model) -> tuple:
+    """
+    Returns:
+        A bound on the creation of the model's rows by the creation of their parent row when the model's table is
+        partitioned, children are never created before their parent
+    """
+
+    return (model.creation >= parent_model.creation,) if _partitioned(model) else ()
+
+
+async def _fetch_children(model, column, parents: list[Mapping]) -> list[Mapping]:
+    """
+    Returns:
+        The rows of the model whose column holds the id of one of the parents, oldest first. Partitioned tables only
+        read rows created after the oldest parent, which skips the partitions from before it.
+    """
+
+    query: model.__table__.select = model.__table__.select().where(
+        any_of(column, [parent["id"] for parent in parents])
+    ).order_by(
+        model.creation, model.id
+    )
+
+    if _partitioned(model):
+        query = query.where(model.creation >= min(parent["creation"] for parent in parents))
+
+    return await db.fetch_all(query)
+
+
+def _build_rounds(rounds: list[dict], round_players: dict[str, list[dict]]) -> list[SchemaRoundInDB]:
+    built = []
+    for _round in rounds:
+        team1_players, team2_players = parse_rounds([
+            SchemaRoundPlayerInDB(**round_player) for round_player in round_players.get(str(_round["id"]), [])
+        ])
+        built.append(
+            SchemaRoundInDB(
+                **_round,
+                team1_players=team1_players,
+                team2_players=team2_players
+            )
+        )
+    return built
+
+
+def _build_sets(sets: list[dict], rounds: dict[str, list[dict]], round_players: dict[str, list[dict]]) -> \
+        list[SchemaSetInDB]:
+    return [
+        SchemaSetInDB(
+            **_set,
+            rounds=_build_rounds(rounds.get(str(_set["id"]), []), round_players)
+        )
+        for _set in sets
+    ]
+
+
+async def build_round_trees(rounds: list[Mapping]) -> list[SchemaRoundInDB]:
+    """
+    Returns:
+        The given round rows with their players, in one query
+    """
+
+    if not rounds:
+        return []
+
+    round_players = await _fetch_children(ModelRoundPlayer, ModelRoundPlayer.round_id, rounds)
+
+    return _build_rounds([dict(_round) for _round in rounds], _group(round_players, "round_id"))
+
+
+async def build_set_trees(sets: list[Mapping]) -> list[SchemaSetInDB]:
+    """
+    Returns:
+        The given set rows with their rounds and players, in two queries
+    """
+
+    if not sets:
+        return []
+
+    rounds = await _fetch_children(ModelRound, ModelRound.set_id, sets)
+    round_players = await _fetch_children(ModelRoundPlayer, ModelRoundPlayer.set_id, sets)
+
+    return _build_sets([dict(_set) for _set in sets], _group(rounds, "set_id"), _group(round_players, "round_id"))
+
+
+async def build_match_trees(matches: list[Mapping]) -> list[SchemaMatchInDB]:
+    """
+    Returns:
+        The given match rows with their sets, rounds and players, in three queries
+    """
+
+    if not matches:
+        return []
+
+    sets = await _fetch_children(ModelSet, ModelSet.match_id, matches)
+    rounds = await _fetch_children(ModelRound, ModelRound.match_id, matches)
+    round_players = await _fetch_children(ModelRoundPlayer, ModelRoundPlayer.match_id, matches)
+
+    sets = _group(sets, "match_id")
+    rounds = _group(rounds, "set_id")
+    round_players = _group(round_players, "round_id")
+
+    return [
+        SchemaMatchInDB(
+            **match,
+            sets=_build_sets(sets.get(str(match["id"]), []), rounds, round_players)
+        )
+        for match in map(dict, matches)
+    ]
+
+
+def _json_object(model, schema, **children) -> sqlalchemy.sql.ColumnElement:
+    """
+    Returns:
+        json_build_object of the model's columns that are fields of the schema, the children and the BaseSchema
+        fields, shaped like the schema's JSON
+    """
+
+    fields = [
+        (sqlalchemy.literal_column("'generated'"), sqlalchemy.func.now()),
+        (sqlalchemy.literal_column("'message'"), sqlalchemy.null()),
+        (sqlalchemy.literal_column("'extra'"), sqlalchemy.null())
+    ]
+    fields += [
+        (sqlalchemy.literal_column(f"'{column.name}'"), column)
+        for column in model.__table__.columns if column.name in schema.__fields__
+    ]
+    fields += [(sqlalchemy.literal_column(f"'{name}'"), child) for name, child in children.items()]
+
+    return sqlalchemy.func.json_build_object(*(argument for field in fields for argument in field))
+
+
+def _json_array(model, json_object, *where) -> sqlalchemy.sql.ColumnElement:
+    """
+    Returns:
+        A correlated subquery aggregating the json_object of every row of the model matching where, oldest first
+    """
+
+    return sqlalchemy.func.coalesce(
+        sqlalchemy.select([
+            sqlalchemy.func.json_agg(aggregate_order_by(json_object, model.creation, model.id))
+        ]).where(sqlalchemy.and_(*where)).as_scalar(),
+        sqlalchemy.literal_column("'[]'::json")
+    )
+
+
+def match_trees_json_query(
+        start_time: datetime.datetime = None,
+        end_time: datetime.datetime = None
+) -> sqlalchemy.sql.Select:
+    """
+    Returns:
+        A query with one row per match holding the match's MatchInDB tree as JSON text, built by Postgres
+    """
+
+    round_player_json = _json_object(ModelRoundPlayer, SchemaRoundPlayerInDB)
+
+    round_json = _json_object(
+        ModelRound,
+        SchemaRoundInDB,
+        team1_players=_json_array(
+            ModelRoundPlayer, round_player_json,
+            ModelRoundPlayer.round_id == ModelRound.id, ModelRoundPlayer.team_number == 0,
+            *_created_after(ModelRoundPlayer, ModelRound)
+        ),
+        team2_players=_json_array(
+            ModelRoundPlayer, round_player_json,
+            ModelRoundPlayer.round_id == ModelRound.id, ModelRoundPlayer.team_number != 0,
+            *_created_after(ModelRoundPlayer, ModelRound)
+        )
+    )
+
+    set_json = _json_object(
+        ModelSet,
+        SchemaSetInDB,
+        rounds=_json_array(
+            ModelRound, round_json,
+            ModelRound.set_id == ModelSet.id, *_created_after(ModelRound, ModelSet)
+        )
+    )
+
+    match_json = _json_object(
+        ModelMatch,
+        SchemaMatchInDB,
+        sets=_json_array(ModelSet, set_json, ModelSet.match_id == ModelMatch.id)
+    )
+
+    query: sqlalchemy.sql.Select = sqlalchemy.select([
+        sqlalchemy.cast(match_json, sqlalchemy.Text).label("match")
+    ]).select_from(
+        ModelMatch.__table__
+    )
+
+    if start_time:
+        query = query.where(ModelMatch.creation >= start_time)
+    if end_time:
+        query = query.where(ModelMatch.creation <= end_time)
+
+    # databases stringifies the result columns without the postgres dialect, which can't render aggregate_order_by
+    matches = query.alias("matches")
+    return sqlalchemy.select([matches.c.match])
+
+
+async def match_trees_json(
+        start_time: datetime.datetime = None,
+        end_time: datetime.datetime = None
+) -> AsyncIterator[bytes]:
+    """
+    Streams a JSON list of MatchInDB trees straight from Postgres, one match at a time through a cursor, without
+    building any dicts or models. Timestamps are formatted by Postgres, so they can have fewer fractional digits.
+    """
+
+    yield b"["
+    separator = b""
+    async for row in db.iterate(match_trees_json_query(start_time, end_time)):
+        yield separator + row["match"].encode()
+        separator = b","
+    yield b"]"
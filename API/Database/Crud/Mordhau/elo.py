@@ -0,0 +1,525 @@
+import bisect
+import datetime
+
+import numpy
+import sqlalchemy
+
+from fastapi import HTTPException
+from fastapi import status
+
+from API.Database import BaseDB
+from API.Database.Crud import any_of
+from API.Database.Models.Mordhau.Game.match import Match as ModelMatch
+from API.Database.Models.Mordhau.elo import EloCheckpoint as ModelEloCheckpoint
+from API.Database.Models.Mordhau.elo import EloLedger as ModelEloLedger
+from API.Database.Models.Mordhau.team import Team as ModelTeam
+
+from API.Database.Crud.Mordhau.team import get_team_by_id
+from API.Database.Crud.Mordhau.team import update_elo
+from API.Database.Crud.Mordhau.team import update_elos
+from API.Database.Crud.Mordhau.team import get_team_elos
+from API.Database.Crud.Mordhau.team import sync_leaderboard
+
+from API.Schemas.Mordhau.elo import EloLedgerInDB as SchemaEloLedgerInDB
+from API.Schemas.Mordhau.team import TeamInDB as SchemaTeamInDB
+
+from API.ELO.replay import Replay
+
+db = BaseDB.db
+
+
+def ledger_entry(team_id, elo_before: int, elo_after: int, match_id=None, creation: datetime.datetime = None) -> dict:
+    entry = {
+        "team_id": str(team_id),
+        "match_id": str(match_id) if match_id else None,
+        "elo_before": int(elo_before),
+        "elo_after": int(elo_after),
+        "delta": int(elo_after) - int(elo_before)
+    }
+
+    if creation:
+        entry["creation"] = creation
+
+    return entry
+
+
+async def create_ledger_entries(entries: list[dict]) -> None:
+    """
+    Appends ledger_entry rows to the elo ledger with a single INSERT
+    """
+
+    if entries:
+        await db.execute(ModelEloLedger.__table__.insert().values(entries))
+
+
+async def override_elo(team_id, new_elo: int) -> SchemaTeamInDB:
+    """
+    Sets a team's elo outside of a match, the change is recorded in the elo ledger without a match
+    """
+
+    team = await get_team_by_id(team_id)
+
+    async with db.transaction():
+        await create_ledger_entries([ledger_entry(team.id, team.elo, new_elo)])
+        team = await update_elo(team.id, new_elo)
+
+    await sync_leaderboard()
+    return team
+
+
+async def get_elo_at(team_id, at: datetime.datetime) -> int:
+    """
+    Returns:
+        The elo the team had at the given time, teams without any ledger history return their current elo
+    """
+
+    query: ModelEloLedger.__table__.select = sqlalchemy.select([ModelEloLedger.elo_after]).where(
+        ModelEloLedger.team_id == team_id
+    ).where(
+        ModelEloLedger.creation <= at
+    ).order_by(
+        ModelEloLedger.creation.desc()
+    ).limit(1)
+
+    if (elo := await db.fetch_val(query)) is not None:
+        return elo
+
+    # Before the first entry the team had the elo that entry started from
+    query: ModelEloLedger.__table__.select = sqlalchemy.select([ModelEloLedger.elo_before]).where(
+        ModelEloLedger.team_id == team_id
+    ).order_by(
+        ModelEloLedger.creation
+    ).limit(1)
+
+    if (elo := await db.fetch_val(query)) is not None:
+        return elo
+
+    return (await get_team_by_id(team_id)).elo
+
+
+async def get_elo_history(
+        team_id,
+        start_time: datetime.datetime = None,
+        end_time: datetime.datetime = None
+) -> list[SchemaEloLedgerInDB]:
+    query: ModelEloLedger.__table__.select = ModelEloLedger.__table__.select().where(
+        ModelEloLedger.team_id == team_id
+    ).order_by(
+        ModelEloLedger.creation
+    )
+
+    if start_time:
+        query = query.where(ModelEloLedger.creation >= start_time)
+    if end_time:
+        query = query.where(ModelEloLedger.creation <= end_time)
+
+    return [SchemaEloLedgerInDB(**dict(entry)) for entry in await db.fetch_all(query)]
+
+
+def match_results_query(
+        after: tuple[datetime.datetime, str] = None,
+        limit: int = None,
+        elo_calculated: bool = True
+) -> sqlalchemy.sql.Select:
+    """
+    Matches in chronological order with the amount of rounds each team won, read from the round counters of the
+    match.
+
+    Args:
+        after: Only matches after this (creation, id) position
+        limit: The maximum amount of matches
+        elo_calculated: Only matches with this elo_calculated flag
+    """
+
+    query: sqlalchemy.sql.Select = sqlalchemy.select([
+        ModelMatch.id,
+        ModelMatch.creation,
+        ModelMatch.team1_id,
+        ModelMatch.team2_id,
+        ModelMatch.team1_rounds_won,
+        ModelMatch.team2_rounds_won
+    ]).where(
+        ModelMatch.elo_calculated == elo_calculated
+    ).where(
+        ModelMatch.team1_id.isnot(None)
+    ).where(
+        ModelMatch.team2_id.isnot(None)
+    ).order_by(
+        ModelMatch.creation, ModelMatch.id
+    )
+
+    if after:
+        query = query.where(sqlalchemy.tuple_(ModelMatch.creation, ModelMatch.id) > sqlalchemy.tuple_(*after))
+    if limit:
+        query = query.limit(limit)
+
+    return query
+
+
+async def iterate_match_results(after: tuple[datetime.datetime, str] = None, batch_size: int = 1000):
+    """
+    Yields every elo calculated match from match_results_query in batches, one query per batch
+    """
+
+    while batch := await db.fetch_all(match_results_query(after=after, limit=batch_size)):
+        yield batch
+        after = (batch[-1]["creation"], batch[-1]["id"])
+
+
+async def get_initial_elos() -> dict[str, int]:
+    """
+    Returns:
+        The elo every team started its ledger history with keyed by team id, teams without any ledger history return
+        their current elo
+    """
+
+    first_elo = sqlalchemy.select([ModelEloLedger.elo_before]).where(
+        ModelEloLedger.team_id == ModelTeam.id
+    ).order_by(
+        ModelEloLedger.creation
+    ).limit(1).as_scalar()
+
+    query = sqlalchemy.select([ModelTeam.id, sqlalchemy.func.coalesce(first_elo, ModelTeam.elo).label("elo")])
+
+    return {str(team["id"]): team["elo"] for team in await db.fetch_all(query)}
+
+
+async def replay_matches(
+        replay: Replay,
+        after: tuple[datetime.datetime, str] = None,
+        batch_size: int = 1000,
+        checkpoint_interval: int = None,
+        starting_elo: int = None
+) -> int:
+    """
+    Streams every match after the given position through the replay and writes the resulting ratings of the teams
+    that played, the checkpoints and the elo ledger of the replayed matches. Elo overrides after the position are
+    applied in between the matches at the time they were made. Should be called within a transaction. The checkpoints
+    are written with the given starting_elo of the replay.
+
+    Returns:
+        The amount of matches replayed
+    """
+
+    query: ModelEloLedger.__table__.delete = ModelEloLedger.__table__.delete().where(
+        ModelEloLedger.match_id.isnot(None)
+    )
+    if after:
+        query = query.where(
+            sqlalchemy.tuple_(ModelEloLedger.creation, ModelEloLedger.match_id) > sqlalchemy.tuple_(*after)
+        )
+    await db.execute(query)
+
+    query: ModelEloLedger.__table__.select = ModelEloLedger.__table__.select().where(
+        ModelEloLedger.match_id.is_(None)
+    ).order_by(
+        ModelEloLedger.creation
+    )
+    if after:
+        query = query.where(ModelEloLedger.creation > after[0])
+    overrides = await db.fetch_all(query)
+
+    replayed = 0
+    checkpoints = []
+    played = set()
+    pending = 0
+
+    async def apply_overrides(before: datetime.datetime = None) -> None:
+        """
+        Sets the ratings of the overrides made before the given time, or of every override left, and points their
+        ledger rows at the replayed elo they replaced
+        """
+
+        nonlocal pending
+        while pending < len(overrides) and (before is None or overrides[pending]["creation"] < before):
+            override = overrides[pending]
+            index = replay.index([override["team_id"]])[0]
+            elo_before = int(replay.ratings[index])
+            replay.ratings[index] = override["elo_after"]
+            played.add(str(override["team_id"]))
+
+            if elo_before != override["elo_before"]:
+                await db.execute(ModelEloLedger.__table__.update().where(
+                    ModelEloLedger.id == override["id"]
+                ).values(elo_before=elo_before, delta=override["elo_after"] - elo_before))
+            pending += 1
+
+    async for batch in iterate_match_results(after=after, batch_size=batch_size):
+        team1_rounds = numpy.fromiter((match["team1_rounds_won"] for match in batch), dtype=numpy.int64)
+        team2_rounds = numpy.fromiter((match["team2_rounds_won"] for match in batch), dtype=numpy.int64)
+        played.update(str(match["team1_id"]) for match in batch)
+        played.update(str(match["team2_id"]) for match in batch)
+
+        # Checkpoints need the ratings part way through the batch, so it's applied in checkpoint sized chunks
+        chunk_size = len(batch)
+        result = {"team1_elo": [], "team2_elo": [], "team1": [], "team2": []}
+
+        creations = [match["creation"] for match in batch]
+
+        start = 0
+        while start < len(batch):
+            await apply_overrides(before=creations[start])
+
+            if checkpoint_interval:
+                chunk_size = checkpoint_interval - replayed % checkpoint_interval
+            end = min(len(batch), start + chunk_size)
+            # Matches from the same time as the next override were played before it
+            if pending < len(overrides):
+                end = min(end, bisect.bisect_right(creations, overrides[pending]["creation"], lo=start))
+
+            chunk_result = replay.apply(
+                [match["team1_id"] for match in batch[start:end]],
+                [match["team2_id"] for match in batch[start:end]],
+                team1_rounds[start:end],
+                team2_rounds[start:end]
+            )
+            for key, ratings in chunk_result.items():
+                result[key].extend(ratings.tolist())
+
+            replayed += end - start
+            if checkpoint_interval and replayed % checkpoint_interval == 0:
+                checkpoints.append({
+                    "match_id": batch[end - 1]["id"],
+                    "match_creation": batch[end - 1]["creation"],
+                    "ratings": replay.snapshot(),
+                    "starting_elo": starting_elo,
+                    "checkpoint_interval": checkpoint_interval
+                })
+            start = end
+
+        ledger = []
+        for row, match in enumerate(batch):
+            if match["team1_rounds_won"] == match["team2_rounds_won"]:
+                continue
+            ledger.append(ledger_entry(match["team1_id"], result["team1_elo"][row], result["team1"][row],
+                                       match_id=match["id"], creation=match["creation"]))
+            ledger.append(ledger_entry(match["team2_id"], result["team2_elo"][row], result["team2"][row],
+                                       match_id=match["id"], creation=match["creation"]))
+        await create_ledger_entries(ledger)
+
+    await apply_overrides()
+
+    if checkpoints:
+        await db.execute(ModelEloCheckpoint.__table__.insert().values(checkpoints))
+
+    ratings = replay.snapshot()
+    await update_elos({team_id: ratings[team_id] for team_id in played})
+
+    return replayed
+
+
+async def _apply_pending(matches: list, played: set[str]) -> dict[str, int]:
+    """
+    Applies the pending matches on top of the current ratings of the teams that played, for calculate_pending_elo
+
+    Returns:
+        The new ratings of the teams that played keyed by team id
+    """
+
+    replay = Replay(ratings=await get_team_elos(list(played)))
+
+    result = replay.apply(
+        [match["team1_id"] for match in matches],
+        [match["team2_id"] for match in matches],
+        numpy.fromiter((match["team1_rounds_won"] for match in matches), dtype=numpy.int64),
+        numpy.fromiter((match["team2_rounds_won"] for match in matches), dtype=numpy.int64)
+    )
+
+    ledger = []
+    for row, match in enumerate(matches):
+        ledger.append(ledger_entry(match["team1_id"], result["team1_elo"][row], result["team1"][row],
+                                   match_id=match["id"], creation=match["creation"]))
+        ledger.append(ledger_entry(match["team2_id"], result["team2_elo"][row], result["team2"][row],
+                                   match_id=match["id"], creation=match["creation"]))
+    await create_ledger_entries(ledger)
+
+    ratings = replay.snapshot()
+    await update_elos(ratings)
+
+    await db.execute(ModelMatch.__table__.update().where(
+        any_of(ModelMatch.id, [match["id"] for match in matches])
+    ).values(elo_calculated=True))
+
+    return ratings
+
+
+async def calculate_pending_elo() -> dict:
+    """
+    Calculates the elo of every match that isn't elo calculated yet, oldest first, the way calculate_elo would one
+    match at a time. Only the round win counts of the matches are read. The team ratings, the elo ledger and the
+    elo_calculated flags are written with one statement each in a single transaction. Matches where both teams won
+    as many rounds, including matches without rounds, are skipped and stay pending. If either team of a match already
+    has ledger history after it the pending matches are calculated by replaying the history from the first of them
+    instead, like calculate_elo, so the ledger stays in order.
+
+    Returns:
+        A dict with the amount of matches calculated, the ids of the skipped matches and the new ratings of the teams
+        that played keyed by team id
+    """
+
+    async with db.transaction():
+        # Locks the pending matches, a concurrent call waits and then finds them calculated
+        matches = await db.fetch_all(match_results_query(elo_calculated=False).with_for_update())
+        skipped = [str(match["id"]) for match in matches if match["team1_rounds_won"] == match["team2_rounds_won"]]
+        matches = [match for match in matches if match["team1_rounds_won"] != match["team2_rounds_won"]]
+
+        if not matches:
+            return {"matches": 0, "skipped": skipped, "ratings": {}}
+
+        played = {str(match["team1_id"]) for match in matches} | {str(match["team2_id"]) for match in matches}
+
+        query: ModelEloLedger.__table__.select = sqlalchemy.select([
+            ModelEloLedger.team_id, sqlalchemy.func.max(ModelEloLedger.creation).label("creation")
+        ]).where(
+            any_of(ModelEloLedger.team_id, list(played))
+        ).group_by(
+            ModelEloLedger.team_id
+        )
+        latest = {str(entry["team_id"]): entry["creation"] for entry in await db.fetch_all(query)}
+
+        if any(
+                match["creation"] < latest.get(str(team_id), match["creation"])
+                for match in matches for team_id in (match["team1_id"], match["team2_id"])
+        ):
+            await db.execute(ModelMatch.__table__.update().where(
+                any_of(ModelMatch.id, [match["id"] for match in matches])
+            ).values(elo_calculated=True))
+
+            # Replayed from the first pending match, a checkpoint after it wouldn't hold the matches before the late one
+            replayed = await replay_elo_from(matches[0]["id"])
+            ratings = {team_id: replayed["ratings"][team_id] for team_id in played}
+        else:
+            ratings = await _apply_pending(matches, played)
+
+    await sync_leaderboard()
+    return {
+        "matches": len(matches),
+        "skipped": skipped,
+        "ratings": ratings
+    }
+
+
+async def replay_elo(starting_elo: int = None, batch_size: int = 1000, checkpoint_interval: int = None) -> dict:
+    """
+    Rebuilds the elo of every team that played an elo calculated match or had its elo overridden by replaying the
+    whole match history, teams start at the elo they started their ledger history with. Teams that never played keep
+    their current elo.
+
+    Args:
+        starting_elo: The elo every team starts the history with instead, see get_initial_elos
+        batch_size: How many matches are read per query
+        checkpoint_interval: Write a rating checkpoint every this many matches, existing checkpoints are replaced
+
+    Returns:
+        A dict with the amount of matches replayed and the new ratings keyed by team id
+    """
+
+    async with db.transaction():
+        if starting_elo is None:
+            replay = Replay(ratings=await get_initial_elos())
+        else:
+            replay = Replay(starting_elo=starting_elo)
+
+        await db.execute(ModelEloCheckpoint.__table__.delete())
+        replayed = await replay_matches(
+            replay,
+            batch_size=batch_size,
+            checkpoint_interval=checkpoint_interval,
+            starting_elo=starting_elo
+        )
+
+    await sync_leaderboard()
+    return {
+        "matches": replayed,
+        "ratings": replay.snapshot()
+    }
+
+
+async def replay_elo_from(match_id, starting_elo: int = None, batch_size: int = 1000,
+                          checkpoint_interval: int = None) -> dict:
+    """
+    Replays the match history from the latest checkpoint before the given match, for when that match or anything
+    after it changed. Only the matches after the checkpoint are read, checkpoints from the given match onwards are
+    replaced. The given match is marked as elo calculated so a match inserted late is counted.
+
+    Args:
+        match_id: The earliest match that changed
+        starting_elo: The starting elo of the replay, see replay_elo. Defaults to the one the checkpoint was written
+            with, a different one is rejected.
+        batch_size: How many matches are read per query
+        checkpoint_interval: Write a rating checkpoint every this many replayed matches, defaults to the interval the
+            existing checkpoints were written with
+
+    Returns:
+        A dict with the amount of matches replayed and the ratings of every team known to the replay keyed by team id
+    """
+
+    query: ModelMatch.__table__.select = sqlalchemy.select([ModelMatch.id, ModelMatch.creation]).where(
+        ModelMatch.id == match_id
+    )
+
+    if not (match := await db.fetch_one(query)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Could not find match with id {match_id}"
+        )
+
+    position = sqlalchemy.tuple_(match["creation"], match["id"])
+    checkpoint_position = sqlalchemy.tuple_(ModelEloCheckpoint.match_creation, ModelEloCheckpoint.match_id)
+
+    query: ModelEloCheckpoint.__table__.select = ModelEloCheckpoint.__table__.select().where(
+        checkpoint_position < position
+    ).order_by(
+        ModelEloCheckpoint.match_creation.desc(), ModelEloCheckpoint.match_id.desc()
+    ).limit(1)
+
+    async with db.transaction():
+        checkpoint = await db.fetch_one(query)
+
+        if checkpoint:
+            if starting_elo is not None and starting_elo != checkpoint["starting_elo"]:
+                written_with = checkpoint["starting_elo"]
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"The checkpoints were written with a starting elo of "
+                           f"{'the first ledger elo' if written_with is None else written_with}, "
+                           f"replay every match instead"
+                )
+            starting_elo = checkpoint["starting_elo"]
+
+        if checkpoint_interval is None:
+            query = sqlalchemy.select([ModelEloCheckpoint.checkpoint_interval]).order_by(
+                ModelEloCheckpoint.match_creation.desc()
+            ).limit(1)
+            checkpoint_interval = await db.fetch_val(query)
+
+        await db.execute(ModelEloCheckpoint.__table__.delete().where(checkpoint_position >= position))
+        await db.execute(ModelMatch.__table__.update().where(
+            ModelMatch.id == match_id
+        ).values(elo_calculated=True))
+
+        if starting_elo is None:
+            replay = Replay(ratings=await get_initial_elos())
+        else:
+            replay = Replay(starting_elo=starting_elo)
+
+        if checkpoint:
+            after = (checkpoint["match_creation"], checkpoint["match_id"])
+            indexes = replay.index(checkpoint["ratings"])
+            replay.ratings[indexes] = list(checkpoint["ratings"].values())
+        else:
+            after = None
+
+        replayed = await replay_matches(
+            replay,
+            after=after,
+            batch_size=batch_size,
+            checkpoint_interval=checkpoint_interval,
+            starting_elo=starting_elo
+        )
+
+    await sync_leaderboard()
+    return {
+        "matches": replayed,
+        "ratings": replay.snapshot()
+    }
@@ -1,17 +1,65 @@
+import numpy
+import sqlalchemy
+
+from sqlalchemy.dialects import postgresql
+
 from fastapi.exceptions import HTTPException
 from fastapi import status
 
 from asyncpg.exceptions import UniqueViolationError
 
 from API.Database.Models.Mordhau.player import Player as ModelPlayer
+from API.Database.Models.Mordhau.player import PlayerRating as ModelPlayerRating
+from API.Database.Models.Mordhau.player import PlayerStats as ModelPlayerStats
+from API.Database.Models.Mordhau.Game.round import Round as ModelRound
+from API.Database.Models.Mordhau.Game.round import RoundPlayer as ModelRoundPlayer
 from API.Database import BaseDB
+from API.Database.Crud import any_of
+from API.Database.Crud.loader import get_loader
+from API.Database.Crud.loader import invalidate
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import fetch_page
 
+from API.Schemas import Page as SchemaPage
 from API.Schemas.Mordhau.player import Player as SchemaPlayer
 from API.Schemas.Mordhau.player import PlayerInDB as SchemaPlayerInDB
+from API.Schemas.Mordhau.player import PlayerRatingInDB as SchemaPlayerRatingInDB
+from API.Schemas.Mordhau.player import PlayerStats as SchemaPlayerStats
+
+from API.ELO.player import PlayerRatingEngine
 
 db = BaseDB.db
 
 
+async def _load_players(player_ids: list[str]) -> dict[str, SchemaPlayerInDB]:
+    query: ModelPlayer.__table__.select = ModelPlayer.__table__.select().where(
+        any_of(ModelPlayer.id, player_ids)
+    )
+
+    return {str(player["id"]): SchemaPlayerInDB(**dict(player)) for player in await db.fetch_all(query)}
+
+
+async def _load_team_players(team_ids: list[str]) -> dict[str, list[SchemaPlayerInDB]]:
+    query: ModelPlayer.__table__.select = ModelPlayer.__table__.select().where(
+        any_of(ModelPlayer.team_id, team_ids)
+    )
+
+    players = {team_id: [] for team_id in team_ids}
+    for player in await db.fetch_all(query):
+        players[str(player["team_id"])].append(SchemaPlayerInDB(**dict(player)))
+    return players
+
+
+def invalidate_player(player_id) -> None:
+    """
+    Forgets a changed player and every loaded roster and team in the current request
+    """
+
+    invalidate("players", player_id)
+    invalidate("team_players")
+    invalidate("teams")
+
+
 async def create_player(player: SchemaPlayer) -> str:
     query: ModelPlayer.__table__.select = ModelPlayer.__table__.insert().values(
         player_name=player.player_name,
@@ -30,7 +78,9 @@ async def delete_player(player_id):
         ModelPlayer.id == player_id
     )
 
-    return await db.execute(query)
+    result = await db.execute(query)
+    invalidate_player(player_id)
+    return result
 
 
 async def get_player_by_name(player_name: str) -> SchemaPlayerInDB:
@@ -48,12 +98,8 @@ async def get_player_by_name(player_name: str) -> SchemaPlayerInDB:
 
 
 async def get_player_by_id(id) -> SchemaPlayerInDB:
-    query: ModelPlayer.__table__.select = ModelPlayer.__table__.select().where(
-        ModelPlayer.id == id
-    )
-
-    if result := await db.fetch_one(query):
-        return SchemaPlayerInDB(**dict(result))
+    if result := await get_loader("players", _load_players).load(id):
+        return result
     else:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -97,14 +143,27 @@ async def get_players() -> list[SchemaPlayerInDB]:
     return []
 
 
-async def get_players_by_team_id(team_id) -> [SchemaPlayerInDB]:
-    query: ModelPlayer.__table__.select = ModelPlayer.__table__.select().where(
-        ModelPlayer.team_id == team_id
+async def get_players_page(cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> SchemaPage[SchemaPlayerInDB]:
+    players, next_cursor, estimated_total = await fetch_page(ModelPlayer, cursor=cursor, limit=limit)
+
+    return SchemaPage[SchemaPlayerInDB](
+        items=[SchemaPlayerInDB(**dict(player)) for player in players],
+        next_cursor=next_cursor,
+        estimated_total=estimated_total
     )
 
-    if result := await db.fetch_all(query):
-        return [SchemaPlayerInDB(**dict(player)) for player in result]
-    return []
+
+async def get_players_by_team_id(team_id) -> [SchemaPlayerInDB]:
+    return await get_loader("team_players", _load_team_players).load(team_id)
+
+
+async def get_players_by_team_ids(team_ids: list) -> list[list[SchemaPlayerInDB]]:
+    """
+    Returns:
+        The players of every given team, in the same order, with a single query
+    """
+
+    return await get_loader("team_players", _load_team_players).load_many(team_ids)
 
 
 async def update_player_discord_id(player_id, new_discord_id):
@@ -112,14 +171,18 @@ async def update_player_discord_id(player_id, new_discord_id):
         ModelPlayer.id == player_id
     ).values(discord_id=new_discord_id)
 
-    return await db.execute(query)
+    result = await db.execute(query)
+    invalidate_player(player_id)
+    return result
 
 async def update_player_name(player_id, name):
     query: ModelPlayer.__table__.update = ModelPlayer.__table__.update().where(
         ModelPlayer.id == player_id
     ).values(player_name=name)
 
-    return await db.execute(query)
+    result = await db.execute(query)
+    invalidate_player(player_id)
+    return result
 
 async def make_ambassador(player_id) -> SchemaPlayerInDB:
     player = await get_player_by_id(player_id)
@@ -129,6 +192,7 @@ async def make_ambassador(player_id) -> SchemaPlayerInDB:
         ).values(ambassador=True)
 
         await db.execute(query)
+        invalidate_player(player_id)
         return player
     else:
         raise HTTPException(
@@ -144,4 +208,177 @@ async def remove_ambassador(player_id) -> SchemaPlayerInDB:
     ).values(ambassador=False)
 
     await db.execute(query)
+    invalidate_player(player_id)
     return player
+
+
+async def get_player_rating(player_id) -> SchemaPlayerRatingInDB:
+    query: ModelPlayerRating.__table__.select = ModelPlayerRating.__table__.select().where(
+        ModelPlayerRating.player_id == player_id
+    )
+
+    if result := await db.fetch_one(query):
+        return SchemaPlayerRatingInDB(**dict(result))
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Could not find a rating for player: {player_id}",
+        )
+
+
+def _rate_round(engine: PlayerRatingEngine, round_players: list) -> None:
+    if not round_players:
+        return
+
+    engine.rate_round(
+        [str(round_player["player_id"]) for round_player in round_players],
+        numpy.fromiter((round_player["team_number"] for round_player in round_players), dtype=numpy.int64),
+        numpy.asarray([
+            (round_player["score"], round_player["kills"], round_player["deaths"], round_player["assists"])
+            for round_player in round_players
+        ], dtype=numpy.float64),
+        round_players[0]["team1_win"]
+    )
+
+
+async def calculate_player_ratings(engine: PlayerRatingEngine = None, batch_size: int = 5000) -> int:
+    """
+    Rates every player from scratch by streaming all round players, round by round in chronological order, through
+    the rating engine. Only one round is held in memory at a time.
+
+    Args:
+        engine: The engine to rate with, a default PlayerRatingEngine when not given
+        batch_size: How many ratings are written per INSERT
+
+    Returns:
+        The amount of players rated
+    """
+
+    engine = engine or PlayerRatingEngine()
+
+    query: sqlalchemy.sql.Select = sqlalchemy.select([
+        ModelRoundPlayer.round_id,
+        ModelRoundPlayer.player_id,
+        ModelRoundPlayer.team_number,
+        ModelRoundPlayer.score,
+        ModelRoundPlayer.kills,
+        ModelRoundPlayer.deaths,
+        ModelRoundPlayer.assists,
+        ModelRound.team1_win
+    ]).select_from(
+        ModelRoundPlayer.__table__.join(ModelRound.__table__, ModelRound.id == ModelRoundPlayer.round_id)
+    ).where(
+        ModelRoundPlayer.player_id.isnot(None)
+    ).order_by(
+        ModelRound.creation, ModelRound.id
+    )
+
+    round_id = None
+    round_players = []
+
+    async for round_player in db.iterate(query):
+        if round_player["round_id"] != round_id:
+            _rate_round(engine, round_players)
+            round_id = round_player["round_id"]
+            round_players = []
+        round_players.append(round_player)
+
+    _rate_round(engine, round_players)
+
+    ratings = [
+        {"player_id": player_id, "rating": rating, "rounds_rated": engine.rounds_rated[player_id]}
+        for player_id, rating in engine.ratings.items()
+    ]
+
+    async with db.transaction():
+        await db.execute(ModelPlayerRating.__table__.delete())
+        for start in range(0, len(ratings), batch_size):
+            await db.execute(ModelPlayerRating.__table__.insert().values(ratings[start:start + batch_size]))
+
+    return len(ratings)
+
+
+_STAT_TOTALS = ("rounds_played", "rounds_won", "score", "kills", "deaths", "assists")
+
+# The upsert targets mfc_player_stats by column name, SQLAlchemy 1.3 writes the key of a column in ON CONFLICT DO
+# UPDATE and ModelBase's modification column has the key Modification
+_player_stats = sqlalchemy.table(
+    ModelPlayerStats.__tablename__,
+    *(sqlalchemy.column(name) for name in ("player_id",) + _STAT_TOTALS + ("modification",))
+)
+
+
+def _player_stats_upsert(round_player_ids: list = None) -> postgresql.Insert:
+    """
+    Returns:
+        An upsert of mfc_player_stats with the totals of the given round players grouped by player, added to the
+        existing totals. Without round player ids the totals of every round player replace the existing ones.
+    """
+
+    won = sqlalchemy.or_(
+        sqlalchemy.and_(ModelRoundPlayer.team_number == 0, ModelRound.team1_win),
+        sqlalchemy.and_(ModelRoundPlayer.team_number != 0, sqlalchemy.not_(ModelRound.team1_win))
+    )
+
+    query: sqlalchemy.sql.Select = sqlalchemy.select([
+        ModelRoundPlayer.player_id,
+        sqlalchemy.func.count().label("rounds_played"),
+        sqlalchemy.func.count().filter(won).label("rounds_won"),
+        sqlalchemy.func.sum(ModelRoundPlayer.score).label("score"),
+        sqlalchemy.func.sum(ModelRoundPlayer.kills).label("kills"),
+        sqlalchemy.func.sum(ModelRoundPlayer.deaths).label("deaths"),
+        sqlalchemy.func.sum(ModelRoundPlayer.assists).label("assists")
+    ]).select_from(
+        ModelRoundPlayer.__table__.join(ModelRound.__table__, ModelRound.id == ModelRoundPlayer.round_id)
+    ).where(
+        ModelRoundPlayer.player_id.isnot(None)
+    ).group_by(
+        ModelRoundPlayer.player_id
+    )
+
+    if round_player_ids is not None:
+        query = query.where(any_of(ModelRoundPlayer.id, round_player_ids))
+
+    table = _player_stats
+    upsert = postgresql.insert(table).from_select(("player_id",) + _STAT_TOTALS, query)
+
+    if round_player_ids is not None:
+        totals = {total: table.c[total] + upsert.excluded[total] for total in _STAT_TOTALS}
+    else:
+        totals = {total: upsert.excluded[total] for total in _STAT_TOTALS}
+
+    return upsert.on_conflict_do_update(
+        index_elements=[table.c.player_id],
+        set_={**totals, "modification": sqlalchemy.func.now()}
+    )
+
+
+async def update_player_stats(round_player_ids: list) -> None:
+    """
+    Adds newly created round players to the stats of their players, should be called in the transaction that created
+    them
+    """
+
+    if round_player_ids:
+        await db.execute(_player_stats_upsert(round_player_ids))
+
+
+async def backfill_player_stats() -> None:
+    """
+    Recalculates the stats of every player that played a round from all round players with one statement
+    """
+
+    await db.execute(_player_stats_upsert())
+
+
+async def get_player_stats(player_id) -> SchemaPlayerStats:
+    query: ModelPlayerStats.__table__.select = ModelPlayerStats.__table__.select().where(
+        ModelPlayerStats.player_id == player_id
+    )
+
+    if result := await db.fetch_one(query):
+        return SchemaPlayerStats(**dict(result))
+
+    # Players that didn't play a round yet, raises a 404 for unknown players
+    player = await get_player_by_id(player_id)
+    return SchemaPlayerStats(player_id=player.id)
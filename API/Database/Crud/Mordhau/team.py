@@ -1,3 +1,8 @@
+import contextvars
+import time
+
+import sqlalchemy
+
 from fastapi.exceptions import HTTPException
 from fastapi import status
 
@@ -7,21 +12,124 @@ from API.Database.Models.Mordhau.team import Team as ModelTeam
 from API.Database.Models.Mordhau.player import Player as ModelPlayer
 
 from API.Database import BaseDB
-
+from API.Database.Crud import any_of
+from API.Database.Crud import in_transaction
+from API.Database.Crud.loader import get_loader
+from API.Database.Crud.loader import invalidate
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import fetch_page
+from API.Database.Crud.Mordhau.Game.head_to_head import forget_head_to_head
+
+from API.Schemas import Page as SchemaPage
 from API.Schemas.Mordhau.team import TeamInDB as SchemaTeamInDB
+from API.Schemas.Mordhau.team import BaseTeamInDB as SchemaBaseTeamInDB
 from API.Schemas.Mordhau.team import Team as SchemaTeam
 
+from API.ELO.leaderboard import Leaderboard
+from API.ELO.prediction import PredictionMatrix
+
 from .player import get_player_by_id
 from .player import get_players_by_team_id
+from .player import get_players_by_team_ids
+from .player import invalidate_player
 
 db = BaseDB.db
 
+# Kept in step with mfc_teams by the functions below, loaded on startup. Each worker process has its own copy, it's
+# reloaded once it's older than LEADERBOARD_MAX_AGE so changes made by other workers show up too.
+leaderboard = Leaderboard()
+predictions = PredictionMatrix(leaderboard)
+
+LEADERBOARD_MAX_AGE = 30
+
+_leaderboard_loaded = None
+
+# Teams changed in this context that the leaderboard doesn't have yet, see sync_leaderboard
+_unsynced: contextvars.ContextVar[set] = contextvars.ContextVar("unsynced_teams")
+
+
+async def _build_teams(rows: list, include_players: bool = True) -> [list[SchemaTeamInDB], list[SchemaBaseTeamInDB]]:
+    """
+    Builds teams from their rows, the rosters of every team are loaded with one query
+    """
+
+    teams = [dict(team) for team in rows]
+    if not include_players:
+        return [SchemaBaseTeamInDB(**team) for team in teams]
+
+    rosters = await get_players_by_team_ids([team["id"] for team in teams])
+    return [SchemaTeamInDB(**team, players=players) for team, players in zip(teams, rosters)]
+
+
+async def _load_teams(team_ids: list[str]) -> dict[str, SchemaTeamInDB]:
+    query: ModelTeam.__table__.select = ModelTeam.__table__.select().where(
+        any_of(ModelTeam.id, team_ids)
+    )
+
+    return {str(team.id): team for team in await _build_teams(await db.fetch_all(query))}
+
+
+async def load_leaderboard() -> None:
+    global _leaderboard_loaded
+
+    query = sqlalchemy.select([ModelTeam.id, ModelTeam.team_name, ModelTeam.elo])
+
+    leaderboard.load([(team["id"], team["team_name"], team["elo"]) for team in await db.fetch_all(query)])
+    _leaderboard_loaded = time.monotonic()
+
+
+async def get_leaderboard() -> Leaderboard:
+    """
+    Returns:
+        The leaderboard, reloaded first if it's older than LEADERBOARD_MAX_AGE
+    """
+
+    if _leaderboard_loaded is None or time.monotonic() - _leaderboard_loaded > LEADERBOARD_MAX_AGE:
+        await load_leaderboard()
+    return leaderboard
+
+
+async def get_predictions() -> PredictionMatrix:
+    """
+    Returns:
+        The predictions of the leaderboard's committed ratings, see get_leaderboard
+    """
+
+    await get_leaderboard()
+    return predictions
+
+
+async def sync_leaderboard() -> None:
+    """
+    Reloads the teams whose elo changed in this context into the leaderboard. Does nothing inside a transaction, the
+    function that started it calls this again once it's committed, so a rolled back change never reaches the
+    leaderboard.
+    """
+
+    if in_transaction() or not (team_ids := _unsynced.get(None)):
+        return
+    _unsynced.set(set())
+
+    query = sqlalchemy.select([ModelTeam.id, ModelTeam.team_name, ModelTeam.elo]).where(
+        any_of(ModelTeam.id, team_ids)
+    )
+
+    for team in await db.fetch_all(query):
+        leaderboard.update(team["id"], elo=team["elo"], team_name=team["team_name"])
+
+
+def _unsynced_teams(*team_ids) -> None:
+    if (unsynced := _unsynced.get(None)) is None:
+        _unsynced.set(unsynced := set())
+    unsynced.update(str(team_id) for team_id in team_ids)
+
 
 async def get_team(
         match_schema=None,
         match_str=None,
         query=None,
-        fetch_one=False
+        fetch_one=False,
+        include_players=True
 ) -> [[SchemaTeamInDB], SchemaTeamInDB]:
     if query is None:
         if not match_schema or not match_str:
@@ -34,31 +142,12 @@ async def get_team(
         result = await db.fetch_one(query)
         if not result:
             return None
+        return (await _build_teams([result], include_players=include_players))[0]
     else:
         result = await db.fetch_all(query)
         if not result:
             return []
-
-    if fetch_one:
-        team = dict(result)
-        players = await get_players_by_team_id(team["id"])
-
-        return SchemaTeamInDB(
-            **team,
-            players=players
-        )
-    else:
-        teams = []
-        for _team in result:
-            single_team = dict(_team)
-            players = await get_players_by_team_id(single_team["id"])
-            teams.append(
-                SchemaTeamInDB(
-                    players=players,
-                    **single_team,
-                )
-            )
-        return teams
+        return await _build_teams(result, include_players=include_players)
 
 
 async def create_team(team: SchemaTeam):
@@ -69,10 +158,13 @@ async def create_team(team: SchemaTeam):
     )
 
     try:
-        return await db.execute(query)
+        team_id = await db.execute(query)
     except UniqueViolationError:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Team already exists")
 
+    leaderboard.update(team_id, elo=team.elo, team_name=team.team_name)
+    return team_id
+
 
 async def delete_team(team_id):
     query = ModelTeam.__table__.delete().where(
@@ -80,16 +172,30 @@ async def delete_team(team_id):
     )
 
     await db.execute(query)
+    invalidate("teams", team_id)
+    leaderboard.remove(team_id)
 
 
-async def get_teams() -> list[SchemaTeamInDB]:
+async def get_teams(include_players: bool = True) -> [list[SchemaTeamInDB], list[SchemaBaseTeamInDB]]:
     query: ModelTeam.__table__.select = ModelTeam.__table__.select()
 
-    return await get_team(query=query, fetch_one=False)
+    return await get_team(query=query, fetch_one=False, include_players=include_players)
+
 
+async def get_teams_page(cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, include_players: bool = True) -> \
+        [SchemaPage[SchemaTeamInDB], SchemaPage[SchemaBaseTeamInDB]]:
+    teams, next_cursor, estimated_total = await fetch_page(ModelTeam, cursor=cursor, limit=limit)
 
-async def get_team_by_discord_id(discord_id: int) -> SchemaTeamInDB:
-    if result := await get_team(match_schema=ModelTeam.discord_id, match_str=discord_id, fetch_one=True):
+    return SchemaPage[SchemaTeamInDB if include_players else SchemaBaseTeamInDB](
+        items=await _build_teams(teams, include_players=include_players),
+        next_cursor=next_cursor,
+        estimated_total=estimated_total
+    )
+
+
+async def get_team_by_discord_id(discord_id: int, include_players: bool = True) -> SchemaTeamInDB:
+    if result := await get_team(match_schema=ModelTeam.discord_id, match_str=discord_id, fetch_one=True,
+                                include_players=include_players):
         return result
     else:
         raise HTTPException(
@@ -98,8 +204,9 @@ async def get_team_by_discord_id(discord_id: int) -> SchemaTeamInDB:
         )
 
 
-async def get_team_by_name(team_name: str) -> SchemaTeamInDB:
-    if result := await get_team(match_schema=ModelTeam.team_name, match_str=team_name, fetch_one=True):
+async def get_team_by_name(team_name: str, include_players: bool = True) -> SchemaTeamInDB:
+    if result := await get_team(match_schema=ModelTeam.team_name, match_str=team_name, fetch_one=True,
+                                include_players=include_players):
         return result
     else:
         raise HTTPException(
@@ -109,8 +216,8 @@ async def get_team_by_name(team_name: str) -> SchemaTeamInDB:
 
 
 async def get_team_by_id(id) -> SchemaTeamInDB:
-    if result := await get_team(match_schema=ModelTeam.id, match_str=id, fetch_one=True):
-        return SchemaTeamInDB(**dict(result))
+    if result := await get_loader("teams", _load_teams).load(id):
+        return result
     else:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -124,17 +231,79 @@ async def update_name(team_id, new_name: str) -> SchemaTeamInDB:
     ).values(team_name=new_name.lower())
 
     await db.execute(query)
+    invalidate("teams", team_id)
+    if team_id in leaderboard:
+        leaderboard.update(team_id, team_name=new_name.lower())
     return await get_team_by_name(new_name.lower())
 
 
 async def update_elo(team_id, new_elo: int) -> SchemaTeamInDB:
     query: ModelTeam.__table__.update = ModelTeam.__table__.update().where(
         ModelTeam.id == team_id,
-    ).values(elo=new_elo)
+    ).values(elo=new_elo).returning(*ModelTeam.__table__.columns)
+
+    if not (result := await db.fetch_one(query)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Could not find team: {team_id}",
+        )
+
+    _unsynced_teams(team_id)
+    await sync_leaderboard()
+    forget_head_to_head(team_id)
+
+    # The updated row is returned, only the roster still has to be loaded
+    team = SchemaTeamInDB(**dict(result), players=await get_players_by_team_id(team_id))
+    get_loader("teams", _load_teams).prime(team_id, team)
+
+    return team
+
+
+async def update_elos(ratings: dict[str, int]) -> None:
+    """
+    Sets the elo of many teams with a single UPDATE, ratings is keyed by team id
+    """
+
+    if not ratings:
+        return
+
+    query = sqlalchemy.text(
+        "UPDATE mfc_teams SET elo = ratings.elo, modification = now() "
+        "FROM unnest(CAST(:team_ids AS uuid[]), CAST(:elos AS integer[])) AS ratings(id, elo) "
+        "WHERE mfc_teams.id = ratings.id"
+    ).bindparams(
+        team_ids=[str(team_id) for team_id in ratings],
+        elos=[int(elo) for elo in ratings.values()]
+    )
 
     await db.execute(query)
+    invalidate("teams", *ratings)
+    forget_head_to_head(*ratings)
 
-    return await get_team_by_id(team_id)
+    _unsynced_teams(*ratings)
+    await sync_leaderboard()
+
+
+async def get_team_elos(team_ids: list[str] = None) -> dict[str, int]:
+    """
+    Returns:
+        The elo of the given teams, or of every team, keyed by team id. Raises a 404 for unknown team ids.
+    """
+
+    query = sqlalchemy.select([ModelTeam.id, ModelTeam.elo])
+    if team_ids is not None:
+        query = query.where(ModelTeam.id.in_([str(team_id) for team_id in team_ids]))
+
+    elos = {str(team["id"]): team["elo"] for team in await db.fetch_all(query)}
+
+    for team_id in team_ids or []:
+        if str(team_id) not in elos:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Could not find team: {team_id}",
+            )
+
+    return elos
 
 
 async def add_player_to_team(player_id, team_id) -> SchemaTeamInDB:
@@ -146,6 +315,7 @@ async def add_player_to_team(player_id, team_id) -> SchemaTeamInDB:
     ).values(team_id=team.id)
 
     await db.execute(query)
+    invalidate_player(player.id)
 
     return await get_team_by_id(team_id)
 
@@ -159,5 +329,6 @@ async def remove_player_from_team(player_id, team_id) -> SchemaTeamInDB:
     ).values(team_id=None)
 
     await db.execute(query)
+    invalidate_player(player.id)
 
     return await get_team_by_id(team.id)
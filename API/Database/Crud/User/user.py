@@ -1,3 +1,5 @@
+import sqlalchemy
+
 from fastapi.exceptions import HTTPException
 from fastapi import status
 
@@ -42,6 +44,16 @@ async def create_user(user: SchemaUserCreate) -> str:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User already exists")
 
 
+async def user_exists(username: str) -> bool:
+    """
+    Checks for a user without loading it, cheaper than hashing a password for create_user to fail on
+    """
+
+    query = sqlalchemy.select([sqlalchemy.exists().where(ModelUser.username == username)])
+
+    return await db.fetch_val(query)
+
+
 async def get_user_by_username(username: str) -> SchemaUserInDBPassword:
     query: ModelUser.__table__.select = ModelUser.__table__.select().where(
         ModelUser.username == username
@@ -1,8 +1,79 @@
+
+import uuid
+
+from typing import AsyncIterator
+
+import orjson
+import sqlalchemy
+
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID
+
 from API.Database import BaseDB
 
 db = BaseDB.db
 
 
+def any_of(column: sqlalchemy.Column, values) -> sqlalchemy.sql.ColumnElement:
+    """
+    Returns:
+        column = ANY(:values), a single array parameter however many values are given
+    """
+
+    values = [str(value) for value in values] if isinstance(column.type, UUID) else list(values)
+
+    return column == sqlalchemy.any_(
+        sqlalchemy.bindparam(f"{column.name}_values", values, type_=ARRAY(column.type), unique=True)
+    )
+
+
+def in_transaction() -> bool:
+    """
+    Returns:
+        If the connection of the current context is inside a transaction, databases has no public way to tell
+    """
+
+    return bool(db.connection()._transaction_stack)
+
+
+def with_ids(values: list[dict]) -> list[str]:
+    """
+    Gives the rows of a multi-row INSERT their ids up front, the rows RETURNING gives back aren't guaranteed to be in
+    the order of the VALUES so they can't be matched up with what was inserted
+
+    Returns:
+        The ids of the rows, in the order of the values
+    """
+
+    for value in values:
+        value["id"] = str(uuid.uuid4())
+    return [value["id"] for value in values]
+
+
+def in_order(values: list[dict]) -> list[dict]:
+    """
+    Gives the rows of a multi-row INSERT creation times a microsecond apart, now() is the same for every row of a
+    statement and rows are read back ordered by (creation, id). The times are taken from the database's clock like the
+    now() of the parents the rows belong to, clock_timestamp() keeps moving within a transaction so they come after
+    them.
+    """
+
+    for offset, value in enumerate(values):
+        value["creation"] = sqlalchemy.literal_column(f"clock_timestamp() + interval '{offset} microseconds'")
+    return values
+
+
+async def iterate_ndjson(query) -> AsyncIterator[bytes]:
+    """
+    Streams the rows of the query as newline delimited JSON through a server side cursor, every row is serialized as
+    it arrives so only one row is held in memory at a time
+    """
+
+    async for row in db.iterate(query):
+        # asyncpg's UUID type isn't uuid.UUID, orjson falls back to str for it
+        yield orjson.dumps(dict(row), default=str) + b"\n"
+
+
 class BaseCrud:
 
 
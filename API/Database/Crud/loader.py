@@ -0,0 +1,122 @@
+"""
+Request scoped loaders that batch and memoize lookups by key.
+
+Every key asked for by coroutines running in the same event loop tick is fetched with one call to the loader's batch
+function, usually a single WHERE id = ANY(...) query, and the result is kept for the rest of the request. The batch
+runs in the task of the coroutine that asked first, so it uses that task's connection and transaction.
+
+Outside of a request scope every get_loader call returns a new loader, lookups are still batched but nothing is kept.
+Writes have to invalidate the keys they change.
+"""
+
+import asyncio
+import contextlib
+
+from contextvars import ContextVar
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+
+BatchLoad = Callable[[list[str]], Awaitable[dict[str, Any]]]
+
+_loaders: ContextVar[dict] = ContextVar("loaders", default=None)
+
+
+class DataLoader:
+
+    def __init__(self, batch_load: BatchLoad):
+        """
+        Args:
+            batch_load: Called with a list of keys, returns the values keyed by key. Keys missing from the result load
+                as None.
+        """
+
+        self.batch_load = batch_load
+        self._cache: dict[str, asyncio.Future] = {}
+        self._queue: dict[str, asyncio.Future] = {}
+
+    def _enqueue(self, key: str) -> asyncio.Future:
+        if (future := self._cache.get(key)) is None:
+            future = self._cache[key] = self._queue[key] = asyncio.get_running_loop().create_future()
+        return future
+
+    async def _dispatch(self) -> None:
+        queue, self._queue = self._queue, {}
+        if not queue:
+            return
+
+        try:
+            values = await self.batch_load(list(queue))
+        except Exception as error:
+            for key, future in queue.items():
+                # Failures aren't kept, the next load tries again
+                self._cache.pop(key, None)
+                future.set_exception(error)
+        else:
+            for key, future in queue.items():
+                future.set_result(values.get(key))
+
+    async def load(self, key) -> Any:
+        future = self._enqueue(str(key))
+
+        if not future.done() and self._queue:
+            # Let every coroutine that is ready to run queue its keys before the batch is sent
+            await asyncio.sleep(0)
+            await self._dispatch()
+
+        return await future
+
+    async def load_many(self, keys) -> list[Any]:
+        futures = [self._enqueue(str(key)) for key in keys]
+        await self._dispatch()
+        return [await future for future in futures]
+
+    def prime(self, key, value: Any) -> None:
+        """
+        Stores a value that is already known, replacing any loaded value
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._cache[str(key)] = future
+
+    def clear(self, *keys) -> None:
+        """
+        Forgets the given keys, or every key when none are given
+        """
+
+        if not keys:
+            self._cache.clear()
+        for key in keys:
+            self._cache.pop(str(key), None)
+
+
+@contextlib.contextmanager
+def request_scope():
+    """
+    Loaders got within this scope, including in tasks started from it, are shared and keep their values until it ends
+    """
+
+    token = _loaders.set({})
+    try:
+        yield
+    finally:
+        _loaders.reset(token)
+
+
+def get_loader(name: str, batch_load: BatchLoad) -> DataLoader:
+    if (loaders := _loaders.get()) is None:
+        return DataLoader(batch_load)
+
+    if (loader := loaders.get(name)) is None:
+        loader = loaders[name] = DataLoader(batch_load)
+    return loader
+
+
+def invalidate(name: str, *keys) -> None:
+    """
+    Forgets the given keys of the named loader in the current request scope, or all of its keys when none are given
+    """
+
+    if (loaders := _loaders.get()) and (loader := loaders.get(name)):
+        loader.clear(*keys)
@@ -0,0 +1,93 @@
+"""
+Keyset pagination on (creation, id), the order every table can be walked in with the creation index of ModelBase.
+
+A page is fetched with creation >= :creation AND (creation > :creation OR id > :id) after the last row of the previous
+page, so every page costs the same however deep into the table it is. The cursor handed to clients is that last row's
+(creation, id) as urlsafe base64, it's opaque and only meant to be passed back.
+"""
+
+import base64
+import binascii
+import datetime
+import uuid
+
+import orjson
+import sqlalchemy
+
+from fastapi import HTTPException
+from fastapi import status
+
+from API.Database import BaseDB
+
+db = BaseDB.db
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(creation: datetime.datetime, id) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([creation.isoformat(), str(id)])).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, str]:
+    """
+    Returns:
+        The (creation, id) of the row the cursor points after, raises a 400 for cursors this API didn't hand out
+    """
+
+    try:
+        creation, id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.datetime.fromisoformat(creation), str(uuid.UUID(str(id)))
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {cursor}")
+
+
+async def estimate_count(model) -> int:
+    """
+    Returns:
+        The planner's estimate of the amount of rows in the model's table, kept up to date by autovacuum. None if the
+        table has never been analyzed.
+    """
+
+    query = sqlalchemy.text(
+        "SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = to_regclass(:table_name)"
+    ).bindparams(table_name=model.__table__.name)
+
+    estimate = await db.fetch_val(query)
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+async def fetch_page(model, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, query=None) -> \
+        tuple[list, str, int]:
+    """
+    Args:
+        model: The model of the table to page through
+        cursor: The cursor of the previous page, the first page is returned without one
+        limit: The page size, capped at MAX_PAGE_SIZE
+        query: A select of the model's table to page through instead of the whole table
+
+    Returns:
+        The rows of the page, the cursor of the next page or None if this is the last one, and the estimated amount of
+        rows in the table
+    """
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if query is None:
+        query: model.__table__.select = model.__table__.select()
+
+    if cursor:
+        creation, id = decode_cursor(cursor)
+        query = query.where(model.creation >= creation).where(
+            sqlalchemy.or_(model.creation > creation, model.id > id)
+        )
+
+    # One row more than asked for tells if there is a next page
+    rows = await db.fetch_all(query.order_by(model.creation, model.id).limit(limit + 1))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["creation"], rows[-1]["id"])
+
+    return rows, next_cursor, await estimate_count(model)
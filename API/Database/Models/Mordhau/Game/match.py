@@ -34,4 +34,19 @@ class Match(ModelBase, AlcBase):
         nullable=False,
         index=True
     )
+    # The rounds each team won over every set, written by create_round and ingest_match and counted from mfc_rounds by
+    # UPGRADES on older databases. A round team 1 didn't win counts towards team 2 whatever its team2_win says. Elo,
+    # head to heads and map stats are read from these instead of the rounds.
+    team1_rounds_won = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, server_default=sqlalchemy.text("0"))
+    team2_rounds_won = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, server_default=sqlalchemy.text("0"))
     sets = relationship(Set, cascade="all, delete", passive_deletes=True)
+
+
+# Head to head lookups match a pair of teams whichever side each played on
+sqlalchemy.Index(
+    "ix_mfc_matches_team_pair_creation",
+    sqlalchemy.func.least(Match.__table__.c.team1_id, Match.__table__.c.team2_id),
+    sqlalchemy.func.greatest(Match.__table__.c.team1_id, Match.__table__.c.team2_id),
+    Match.__table__.c.creation,
+    Match.__table__.c.id
+)
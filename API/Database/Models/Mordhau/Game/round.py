@@ -1,15 +1,22 @@
 import sqlalchemy
 
+from sqlalchemy.orm import foreign
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
 from API.Database.Models import ModelBase
 from API.Database.Models import AlcBase
+from API.Database.partitions import PARTITION_ROUNDS
+from API.Database.partitions import partition_key
 
 
 class RoundPlayer(ModelBase, AlcBase):
     __tablename__ = "mfc_round_players"
 
+    if PARTITION_ROUNDS:
+        __table_args__ = {"postgresql_partition_by": "RANGE (creation)"}
+        creation = partition_key(ModelBase.creation)
+
     score = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
     kills = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
     deaths = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
@@ -26,7 +33,11 @@ class RoundPlayer(ModelBase, AlcBase):
         nullable=False
     )
     player_id = sqlalchemy.Column(UUID, sqlalchemy.ForeignKey("mfc_players.id", ondelete="SET NULL"))
-    round_id = sqlalchemy.Column(UUID, sqlalchemy.ForeignKey("mfc_rounds.id", ondelete="CASCADE"), index=True)
+    if PARTITION_ROUNDS:
+        # A foreign key to a partitioned table would have to hold its creation as well
+        round_id = sqlalchemy.Column(UUID, index=True)
+    else:
+        round_id = sqlalchemy.Column(UUID, sqlalchemy.ForeignKey("mfc_rounds.id", ondelete="CASCADE"), index=True)
     set_id = sqlalchemy.Column(UUID, sqlalchemy.ForeignKey("mfc_sets.id", ondelete="CASCADE"), index=True)
     match_id = sqlalchemy.Column(UUID, sqlalchemy.ForeignKey("mfc_matches.id", ondelete="CASCADE"), index=True)
 
@@ -34,8 +45,17 @@ class RoundPlayer(ModelBase, AlcBase):
 class Round(ModelBase, AlcBase):
     __tablename__ = "mfc_rounds"
 
+    if PARTITION_ROUNDS:
+        __table_args__ = {"postgresql_partition_by": "RANGE (creation)"}
+        creation = partition_key(ModelBase.creation)
+
     team1_win = sqlalchemy.Column(sqlalchemy.Boolean, nullable=False, default=False)
     team2_win = sqlalchemy.Column(sqlalchemy.Boolean, nullable=False, default=False)
     set_id = sqlalchemy.Column(UUID, sqlalchemy.ForeignKey("mfc_sets.id", ondelete="CASCADE"), index=True)
     match_id = sqlalchemy.Column(UUID, sqlalchemy.ForeignKey("mfc_matches.id", ondelete="CASCADE"), index=True)
-    round_players = relationship(RoundPlayer, cascade="all, delete", passive_deletes=True)
+    round_players = relationship(
+        RoundPlayer,
+        primaryjoin=lambda: Round.id == foreign(RoundPlayer.round_id),
+        cascade="all, delete",
+        passive_deletes=True
+    )
@@ -14,4 +14,7 @@ class Set(ModelBase, AlcBase):
 
     map = sqlalchemy.Column(sqlalchemy.String, index=True)
     match_id = sqlalchemy.Column(UUID, sqlalchemy.ForeignKey("mfc_matches.id", ondelete="CASCADE"), index=True)
+    # The rounds each team won in the set, counted like the round counters of Match
+    team1_rounds_won = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, server_default=sqlalchemy.text("0"))
+    team2_rounds_won = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, server_default=sqlalchemy.text("0"))
     rounds = relationship(Round, cascade="all, delete", passive_deletes=True)
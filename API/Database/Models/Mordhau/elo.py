@@ -0,0 +1,55 @@
+import sqlalchemy
+
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB
+
+from API.Database.Models import ModelBase
+from API.Database.Models import AlcBase
+
+
+class EloCheckpoint(ModelBase, AlcBase):
+    """
+    Every team's rating right after the match with match_id was applied, used to resume an elo replay part way
+    through the match history. Holds the starting elo of the replay that wrote it, null when teams started at their
+    first ledger elo, and the amount of matches between checkpoints.
+    """
+
+    __tablename__ = "mfc_elo_checkpoints"
+
+    match_id = sqlalchemy.Column(
+        UUID,
+        sqlalchemy.ForeignKey("mfc_matches.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    match_creation = sqlalchemy.Column(sqlalchemy.DateTime(timezone=True), nullable=False, index=True)
+    ratings = sqlalchemy.Column(JSONB, nullable=False)
+    starting_elo = sqlalchemy.Column(sqlalchemy.Integer, nullable=True)
+    checkpoint_interval = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+
+
+class EloLedger(ModelBase, AlcBase):
+    """
+    Append-only history of elo changes. Rows written for a match carry the creation of that match, so the last row of
+    a team at or before a point in time holds the elo the team had at that time.
+    """
+
+    __tablename__ = "mfc_elo_ledger"
+    __table_args__ = (
+        sqlalchemy.Index("ix_mfc_elo_ledger_team_id_creation", "team_id", "creation"),
+    )
+
+    team_id = sqlalchemy.Column(
+        UUID,
+        sqlalchemy.ForeignKey("mfc_teams.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    match_id = sqlalchemy.Column(
+        UUID,
+        sqlalchemy.ForeignKey("mfc_matches.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True
+    )
+    elo_before = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+    elo_after = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+    delta = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
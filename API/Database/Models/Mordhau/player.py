@@ -22,3 +22,40 @@ class Player(ModelBase, AlcBase):
         sqlalchemy.Boolean,
         index=True
     )
+
+
+class PlayerRating(ModelBase, AlcBase):
+    __tablename__ = "mfc_player_ratings"
+
+    player_id = sqlalchemy.Column(
+        UUID,
+        sqlalchemy.ForeignKey("mfc_players.id", ondelete="CASCADE"),
+        unique=True,
+        index=True,
+        nullable=False
+    )
+    rating = sqlalchemy.Column(sqlalchemy.Float, index=True, nullable=False)
+    rounds_rated = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+
+
+class PlayerStats(ModelBase, AlcBase):
+    """
+    Career totals of every player, kept up to date as round players are created. Filled from the existing round
+    players when the table is created, see BACKFILLS.
+    """
+
+    __tablename__ = "mfc_player_stats"
+
+    player_id = sqlalchemy.Column(
+        UUID,
+        sqlalchemy.ForeignKey("mfc_players.id", ondelete="CASCADE"),
+        unique=True,
+        index=True,
+        nullable=False
+    )
+    rounds_played = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    rounds_won = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    score = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, default=0)
+    kills = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, default=0)
+    deaths = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, default=0)
+    assists = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, default=0)
@@ -0,0 +1,15 @@
+import sqlalchemy
+
+from API.Database.Models import ModelBase
+from API.Database.Models import AlcBase
+
+
+class SchemaFingerprint(ModelBase, AlcBase):
+    """
+    A hash of the DDL of every model and the upgrades, written whenever the API brought the tables up to date. The
+    latest row matching the models means there is nothing for create_tables and upgrade_tables to do.
+    """
+
+    __tablename__ = "mfc_schema_fingerprints"
+
+    fingerprint = sqlalchemy.Column(sqlalchemy.String, nullable=False)
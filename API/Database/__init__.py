@@ -1,13 +1,22 @@
+import hashlib
+import logging
+
 import sqlalchemy
 import databases
 
+from asyncpg.exceptions import UndefinedTableError
 from databases import Database
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.schema import CreateTable
 
 from API import config
 
 from API.Database.Models import ModelBase
 from API.Database.Models import metadata
 
+log = logging.getLogger(__name__)
+
 
 class BaseDB:
     SQLALCHEMY_DATABASE_URL = config("SQL_DB_URL", cast=databases.DatabaseURL)
@@ -17,9 +26,121 @@ class BaseDB:
 
     db = Database(str(SQLALCHEMY_DATABASE_URL))
 
+    # Skip create_tables and upgrade_tables on startup when the stored schema fingerprint matches the models
+    SCHEMA_FINGERPRINT = config("SCHEMA_FINGERPRINT", cast=bool, default=True)
+
+    @staticmethod
+    def _metadatas() -> list[sqlalchemy.MetaData]:
+        metadatas = {id(metadata): metadata}
+        for subclass in ModelBase.__subclasses__():
+            metadatas.setdefault(id(subclass.metadata), subclass.metadata)
+        return list(metadatas.values())
+
+    @classmethod
+    def create_tables(cls, engine: sqlalchemy.engine.Engine = None):
+        """
+        Creates missing tables and runs the backfills of the ones that were just created
+        """
+
+        from API.Database.upgrades import BACKFILLS
+
+        engine = engine or sqlalchemy.create_engine(str(cls.SQLALCHEMY_DATABASE_URL))
+        existing = set(sqlalchemy.inspect(engine).get_table_names())
+
+        # Every model shares one of a few metadata objects, each is only created once
+        for models_metadata in cls._metadatas():
+            models_metadata.create_all(engine)
+
+        with engine.begin() as connection:
+            for table_name, statements in BACKFILLS.items():
+                if table_name in existing:
+                    continue
+
+                log.info(f"Backfilling new table \"{table_name}\"")
+                for statement in statements:
+                    connection.execute(sqlalchemy.text(statement))
+
+    @classmethod
+    def schema_fingerprint(cls) -> str:
+        """
+        Returns:
+            A hash of the CREATE statements of every table and index of the models and of the upgrade and backfill
+            statements
+        """
+
+        from API.Database.upgrades import BACKFILLS
+        from API.Database.upgrades import UPGRADES
+
+        dialect = postgresql.dialect()
+        statements = []
+        for models_metadata in cls._metadatas():
+            for table in models_metadata.sorted_tables:
+                statements.append(str(CreateTable(table).compile(dialect=dialect)))
+                statements.extend(
+                    str(CreateIndex(index).compile(dialect=dialect))
+                    for index in sorted(table.indexes, key=lambda index: index.name)
+                )
+        for _, _, upgrade_statements in UPGRADES:
+            statements.extend(upgrade_statements)
+        for backfill_statements in BACKFILLS.values():
+            statements.extend(backfill_statements)
+
+        return hashlib.sha256("\n".join(statements).encode()).hexdigest()
+
+    @classmethod
+    async def schema_is_current(cls, fingerprint: str) -> bool:
+        """
+        Returns:
+            If the fingerprint of the last time the tables were brought up to date is the given one
+        """
+
+        query = sqlalchemy.text(
+            "SELECT fingerprint FROM mfc_schema_fingerprints ORDER BY creation DESC LIMIT 1"
+        )
+
+        try:
+            return await cls.db.fetch_val(query) == fingerprint
+        except UndefinedTableError:
+            return False
+
+    @classmethod
+    async def store_schema_fingerprint(cls, fingerprint: str) -> None:
+        from API.Database.Models.schema import SchemaFingerprint
+
+        await cls.db.execute(SchemaFingerprint.__table__.insert().values(fingerprint=fingerprint))
+
     @classmethod
-    def create_tables(cls):
+    def sync_tables(cls):
+        """
+        Creates missing tables and runs the upgrades they still need with one engine
+        """
+
         engine = sqlalchemy.create_engine(str(cls.SQLALCHEMY_DATABASE_URL))
-        metadata.create_all(engine)
-        for subclass in ModelBase.__subclasses__():
-            subclass.metadata.create_all(engine)
+        try:
+            cls.create_tables(engine)
+            cls.upgrade_tables(engine)
+        finally:
+            engine.dispose()
+
+    @classmethod
+    def upgrade_tables(cls, engine: sqlalchemy.engine.Engine = None):
+        """
+        Runs the upgrades of API.Database.upgrades whose column or index doesn't exist yet
+        """
+
+        from API.Database.upgrades import UPGRADES
+
+        engine = engine or sqlalchemy.create_engine(str(cls.SQLALCHEMY_DATABASE_URL))
+        query = sqlalchemy.text(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = :table_name AND column_name = :name "
+            "UNION ALL SELECT 1 FROM pg_indexes WHERE tablename = :table_name AND indexname = :name"
+        )
+
+        with engine.begin() as connection:
+            for table_name, name, statements in UPGRADES:
+                if connection.execute(query, table_name=table_name, name=name).scalar():
+                    continue
+
+                log.info(f"Upgrading table \"{table_name}\", adding \"{name}\"")
+                for statement in statements:
+                    connection.execute(sqlalchemy.text(statement))
@@ -0,0 +1,110 @@
+"""
+Optional range partitioning of mfc_rounds and mfc_round_players by creation month, turned on with PARTITION_ROUNDS.
+
+With it set the tables are created partitioned, so each month's rows and indexes live in their own partition and old
+seasons are never rewritten or vacuumed again. Partitions for the current month and the PARTITION_MONTHS_AHEAD months
+after it are created on startup and once a day after that, rows outside of them go to a default partition. Queries
+bounded on creation only read the partitions of their time range.
+
+The primary key of a partitioned table has to hold the partition key, so it's (id, creation) and mfc_round_players
+can't have a foreign key to mfc_rounds. Round players are only created for rounds that were looked up first, and are
+still deleted with their set and match. Only new tables are created partitioned, tables that already exist are left
+alone.
+"""
+
+import asyncio
+import datetime
+import logging
+
+import sqlalchemy
+
+from asyncpg import PostgresError
+
+from API import config
+from API.Database import BaseDB
+
+log = logging.getLogger(__name__)
+
+db = BaseDB.db
+
+PARTITION_ROUNDS = config("PARTITION_ROUNDS", cast=bool, default=False)
+PARTITION_MONTHS_AHEAD = config("PARTITION_MONTHS_AHEAD", cast=int, default=3)
+
+PARTITIONED_TABLES = ("mfc_rounds", "mfc_round_players")
+
+# Taken by the worker creating partitions, so workers starting at once don't race each other
+_LOCK_KEY = 0x6D6663
+
+
+def partition_key(column: sqlalchemy.Column) -> sqlalchemy.Column:
+    """
+    Returns:
+        A copy of ModelBase's creation column that is part of the primary key, for the models of partitioned tables
+    """
+
+    column = column.copy()
+    column.primary_key = True
+    return column
+
+
+def _months(start: datetime.date, amount: int) -> list[datetime.date]:
+    months = [start.replace(day=1)]
+    while len(months) < amount + 1:
+        month = months[-1]
+        months.append(month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1))
+    return months
+
+
+async def create_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD) -> None:
+    """
+    Creates the default partition and the monthly partitions from this month until months_ahead months from now of
+    every partitioned table that doesn't have them yet
+    """
+
+    months = _months(datetime.datetime.now(tz=datetime.timezone.utc).date(), months_ahead + 1)
+
+    async with db.transaction():
+        await db.execute(sqlalchemy.text("SELECT pg_advisory_xact_lock(:key)").bindparams(key=_LOCK_KEY))
+
+        for table_name in PARTITIONED_TABLES:
+            query = sqlalchemy.text(
+                "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table_name)"
+            ).bindparams(table_name=table_name)
+
+            if not await db.fetch_val(query):
+                log.warning(f"Table \"{table_name}\" isn't partitioned, it was created before PARTITION_ROUNDS was set")
+                continue
+
+            await db.execute(f"CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT")
+
+            for start, end in zip(months, months[1:]):
+                partition_name = f"{table_name}_{start:%Y_%m}"
+                if await db.fetch_val(sqlalchemy.text("SELECT to_regclass(:name)").bindparams(name=partition_name)):
+                    continue
+
+                # Fails if the default partition already holds rows of the month, the month then stays in it
+                try:
+                    async with db.transaction():
+                        await db.execute(
+                            f"CREATE TABLE {partition_name} PARTITION OF {table_name} "
+                            f"FOR VALUES FROM ('{start} 00:00+00') TO ('{end} 00:00+00')"
+                        )
+                except PostgresError as error:
+                    log.error(f"Could not create partition \"{partition_name}\": {error}")
+                    continue
+
+                log.info(f"Created partition \"{partition_name}\"")
+
+
+async def maintain_partitions(interval: float = 24 * 60 * 60) -> None:
+    """
+    Creates partitions ahead of time every interval seconds until cancelled, the first time after one interval. Has
+    to run in a context without a database connection, see BaseApplication.startup.
+    """
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await create_partitions()
+        except Exception as error:
+            log.error(f"Could not create partitions: {error}")
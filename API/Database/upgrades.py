@@ -0,0 +1,77 @@
+"""
+Changes to tables that already exist, metadata.create_all only creates tables that are missing.
+
+Every upgrade is the table and the column or index it adds with the statements that add and backfill it.
+BaseDB.upgrade_tables runs the statements of an upgrade in one transaction the first time the API starts without its
+column or index, new databases get them from create_all and skip it. The statements must be safe to run twice, two
+workers can start at once.
+
+Tables that hold totals of data that may already exist have backfills instead, BaseDB.create_tables runs them in one
+transaction right after create_all created the table.
+"""
+
+_round_counts = (
+    "SELECT {key}, "
+    "count(*) FILTER (WHERE team1_win) AS team1_rounds_won, "
+    "count(*) FILTER (WHERE NOT team1_win) AS team2_rounds_won "
+    "FROM mfc_rounds GROUP BY {key}"
+)
+
+UPGRADES: list[tuple[str, str, list[str]]] = [
+    (
+        "mfc_sets",
+        "team1_rounds_won",
+        [
+            "ALTER TABLE mfc_sets "
+            "ADD COLUMN IF NOT EXISTS team1_rounds_won integer NOT NULL DEFAULT 0, "
+            "ADD COLUMN IF NOT EXISTS team2_rounds_won integer NOT NULL DEFAULT 0",
+            "UPDATE mfc_sets "
+            "SET team1_rounds_won = counts.team1_rounds_won, team2_rounds_won = counts.team2_rounds_won "
+            f"FROM ({_round_counts.format(key='set_id')}) AS counts WHERE mfc_sets.id = counts.set_id"
+        ]
+    ),
+    (
+        "mfc_matches",
+        "team1_rounds_won",
+        [
+            "ALTER TABLE mfc_matches "
+            "ADD COLUMN IF NOT EXISTS team1_rounds_won integer NOT NULL DEFAULT 0, "
+            "ADD COLUMN IF NOT EXISTS team2_rounds_won integer NOT NULL DEFAULT 0",
+            "UPDATE mfc_matches "
+            "SET team1_rounds_won = counts.team1_rounds_won, team2_rounds_won = counts.team2_rounds_won "
+            f"FROM ({_round_counts.format(key='match_id')}) AS counts WHERE mfc_matches.id = counts.match_id"
+        ]
+    ),
+    (
+        "mfc_matches",
+        "ix_mfc_matches_team_pair_creation",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_mfc_matches_team_pair_creation ON mfc_matches "
+            "(least(team1_id, team2_id), greatest(team1_id, team2_id), creation, id)"
+        ]
+    ),
+    (
+        "mfc_elo_checkpoints",
+        "checkpoint_interval",
+        [
+            # The starting elo of older checkpoints is unknown, a replay without them starts from the beginning
+            "DELETE FROM mfc_elo_checkpoints",
+            "ALTER TABLE mfc_elo_checkpoints "
+            "ADD COLUMN IF NOT EXISTS starting_elo integer, "
+            "ADD COLUMN IF NOT EXISTS checkpoint_interval integer NOT NULL"
+        ]
+    )
+]
+
+BACKFILLS: dict[str, list[str]] = {
+    "mfc_player_stats": [
+        "INSERT INTO mfc_player_stats (player_id, rounds_played, rounds_won, score, kills, deaths, assists) "
+        "SELECT mfc_round_players.player_id, count(*), "
+        "count(*) FILTER (WHERE (mfc_round_players.team_number = 0) = mfc_rounds.team1_win), "
+        "sum(mfc_round_players.score), sum(mfc_round_players.kills), sum(mfc_round_players.deaths), "
+        "sum(mfc_round_players.assists) "
+        "FROM mfc_round_players JOIN mfc_rounds ON mfc_rounds.id = mfc_round_players.round_id "
+        "WHERE mfc_round_players.player_id IS NOT NULL GROUP BY mfc_round_players.player_id "
+        "ON CONFLICT (player_id) DO NOTHING"
+    ]
+}
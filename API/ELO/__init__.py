@@ -1,9 +1,11 @@
+import numpy
+
 from API.ELO.team import Team
 
 
 class ELO:
 
-    def __init__(self, volatility: int = 150, gain_ceiling: int = 400):
+    def __init__(self, volatility: int = 150, gain_ceiling: int = 400, multiplication_factor: int = 25):
         """
 
         Args:
@@ -11,10 +13,12 @@ class ELO:
             gain_ceiling: The amount of elo difference two teams can be before a winning team that doesn't win all
                 rounds against a losing team beings to lose small amounts of elo. Effectively the amount difference in
                 ELO between two teams allowed before one of the two teams loses elo even when losing in a small amount.
+            multiplication_factor: The baseline amount of elo a winner gains and a loser loses, see _calculate_baseline
         """
 
         self.volatility = volatility
         self.gain_ceiling = gain_ceiling
+        self.multiplication_factor = multiplication_factor
 
     @staticmethod
     def _calculate_rounds_ratio(team1_rounds: int, team2_rounds: int) -> float:
@@ -67,7 +71,7 @@ class ELO:
 
         rounds_ratio = self._calculate_rounds_ratio(team1.rounds_won, team2.rounds_won)
         expected_score = self._calculate_expected_score(team1.elo, team2.elo)
-        baseline = self._calculate_baseline(team1.rounds_won, team2.rounds_won)
+        baseline = self._calculate_baseline(team1.rounds_won, team2.rounds_won, self.multiplication_factor)
 
         team1_new_elo = team1.elo + (self.volatility * (rounds_ratio - expected_score)) + baseline
         elo_change = abs(team1_new_elo - team1.elo)
@@ -84,6 +88,51 @@ class ELO:
 
         return elo_result_dict
 
+    def calculate_batch(
+            self,
+            team1_elo: numpy.ndarray,
+            team2_elo: numpy.ndarray,
+            team1_rounds: numpy.ndarray,
+            team2_rounds: numpy.ndarray
+    ) -> dict[str, numpy.ndarray]:
+        """
+        Vectorized variant of calculate, each row of the given arrays is one match. Results match calculate row by
+        row up to floating point rounding.
+
+        Rows where both teams won the same amount of rounds are left unchanged, a tie can't be rated (see
+        calculate_elo).
+
+        Args:
+            team1_elo: The elo of team 1 for every match
+            team2_elo: The elo of team 2 for every match
+            team1_rounds: How many rounds team 1 won in every match
+            team2_rounds: How many rounds team 2 won in every match
+
+        Returns:
+            A dict with keys "team1" and "team2" which both have a float array with the new elo of each match's teams.
+        """
+
+        team1_elo = numpy.asarray(team1_elo, dtype=numpy.float64)
+        team2_elo = numpy.asarray(team2_elo, dtype=numpy.float64)
+        team1_rounds = numpy.asarray(team1_rounds, dtype=numpy.int64)
+        team2_rounds = numpy.asarray(team2_rounds, dtype=numpy.int64)
+
+        tie = team1_rounds == team2_rounds
+
+        # Ties divide by zero in both the rounds ratio and the baseline, those rows are masked out below
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            rounds_ratio = self._calculate_rounds_ratio(team1_rounds, team2_rounds)
+            expected_score = self._calculate_expected_score(team1_elo, team2_elo)
+            baseline = self._calculate_baseline(team1_rounds, team2_rounds, self.multiplication_factor)
+
+        team1_new_elo = team1_elo + (self.volatility * (rounds_ratio - expected_score)) + baseline
+        team2_new_elo = team2_elo - (team1_new_elo - team1_elo)
+
+        return {
+            "team1": numpy.where(tie, team1_elo, team1_new_elo),
+            "team2": numpy.where(tie, team2_elo, team2_new_elo)
+        }
+
 
 if __name__ == "__main__":
     team1 = Team(elo=2022, rounds_won=10)
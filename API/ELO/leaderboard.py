@@ -0,0 +1,175 @@
+import random
+
+
+class _Node:
+    __slots__ = ("key", "priority", "size", "left", "right")
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.priority = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _size(node: _Node) -> int:
+    return node.size if node else 0
+
+
+def _update(node: _Node) -> _Node:
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+def _split(node: _Node, key: tuple) -> tuple[_Node, _Node]:
+    """
+    Returns:
+        A tree with every key lower than the given key and a tree with the rest
+    """
+    if not node:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return _update(node), right
+    left, node.left = _split(node.left, key)
+    return left, _update(node)
+
+
+def _merge(left: _Node, right: _Node) -> _Node:
+    """
+    Every key in left must be lower than every key in right
+    """
+    if not left or not right:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+class Leaderboard:
+
+    def __init__(self):
+        """
+        Teams ordered by elo, highest first, in an order statistic tree (a treap keyed on (-elo, team id) where every
+        node knows the size of its subtree). Ranks and pages are found in O(log n) without touching the database.
+        """
+
+        self._root: _Node = None
+        self.teams: dict[str, tuple[int, str]] = {}
+        # Bumped whenever a team is added, removed or changes elo, lets caches built from the ratings go stale
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+    def __contains__(self, team_id) -> bool:
+        return str(team_id) in self.teams
+
+    def load(self, teams: list[tuple[str, str, int]]) -> None:
+        """
+        Replaces the leaderboard with the given (team id, team name, elo) tuples, the version is kept when nothing
+        changed
+        """
+        teams = {str(team_id): (int(elo), team_name) for team_id, team_name, elo in teams}
+        if teams == self.teams:
+            return
+
+        self._root = None
+        self.teams = {}
+        self.version += 1
+        for team_id, (elo, team_name) in teams.items():
+            self.update(team_id, team_name=team_name, elo=elo)
+
+    def update(self, team_id, elo: int = None, team_name: str = None) -> None:
+        """
+        Adds a team or changes its elo and/or name, unknown teams need both
+        """
+        team_id = str(team_id)
+
+        if team_id in self.teams:
+            current_elo, current_name = self.teams[team_id]
+            elo = current_elo if elo is None else elo
+            team_name = current_name if team_name is None else team_name
+            if elo != current_elo:
+                self._remove_key((-current_elo, team_id))
+                self._insert_key((-elo, team_id))
+                self.version += 1
+        elif elo is None or team_name is None:
+            raise KeyError(team_id)
+        else:
+            self._insert_key((-elo, team_id))
+            self.version += 1
+
+        self.teams[team_id] = (int(elo), team_name)
+
+    def remove(self, team_id) -> None:
+        team_id = str(team_id)
+        if team_id in self.teams:
+            elo, _ = self.teams.pop(team_id)
+            self._remove_key((-elo, team_id))
+            self.version += 1
+
+    def rank(self, team_id) -> int:
+        """
+        Returns:
+            The 1 based rank of the team, teams with the same elo share a rank
+        """
+        elo, _ = self.teams[str(team_id)]
+
+        # Every key of a team with a higher elo is lower than (-elo, "")
+        key = (-elo, "")
+        rank = 1
+        node = self._root
+        while node:
+            if node.key < key:
+                rank += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return rank
+
+    def select(self, index: int) -> str:
+        """
+        Returns:
+            The id of the team at the 0 based position
+        """
+        node = self._root
+        while node:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node.key[1]
+            else:
+                index -= left_size + 1
+                node = node.right
+        raise IndexError(index)
+
+    def page(self, offset: int = 0, limit: int = 25) -> list[dict]:
+        """
+        Returns:
+            Up to limit teams starting at the 0 based offset as dicts with a rank, id, team_name and elo
+        """
+        page = []
+        for index in range(offset, min(offset + limit, len(self))):
+            team_id = self.select(index)
+            elo, team_name = self.teams[team_id]
+            page.append({
+                "rank": self.rank(team_id),
+                "id": team_id,
+                "team_name": team_name,
+                "elo": elo
+            })
+        return page
+
+    def _insert_key(self, key: tuple) -> None:
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key)), right)
+
+    def _remove_key(self, key: tuple) -> None:
+        left, right = _split(self._root, key)
+        # (-elo, id + "\0") is the next possible key, splitting on it leaves the removed key on its own
+        _, right = _split(right, (key[0], key[1] + "\0"))
+        self._root = _merge(left, right)
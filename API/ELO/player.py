@@ -0,0 +1,100 @@
+import numpy
+
+
+class PlayerRatingEngine:
+
+    def __init__(
+            self,
+            starting_rating: float = 1500,
+            k_factor: float = 16,
+            scale: float = 400,
+            team_weight: float = 0.5,
+            score_weight: float = 1,
+            kills_weight: float = 100,
+            deaths_weight: float = -100,
+            assists_weight: float = 50
+    ):
+        """
+        Rates players round by round. A player's result in a round is their team's outcome blended with how they
+        performed compared to everyone else in that round, their expected result comes from their rating against the
+        average rating of the opposing team.
+
+        Args:
+            starting_rating: The rating of a player the first time they are seen
+            k_factor: The most rating a player can win/lose from a single round
+            scale: The rating difference at which a player is expected to score 10 times as much as their opponents
+            team_weight: How much of a round's result is the team outcome, the rest is the player's performance
+            score_weight: Weight of a player's score in their performance
+            kills_weight: Weight of a player's kills in their performance
+            deaths_weight: Weight of a player's deaths in their performance
+            assists_weight: Weight of a player's assists in their performance
+        """
+
+        self.starting_rating = starting_rating
+        self.k_factor = k_factor
+        self.scale = scale
+        self.team_weight = team_weight
+        self.weights = numpy.asarray([score_weight, kills_weight, deaths_weight, assists_weight], dtype=numpy.float64)
+
+        self.ratings: dict[str, float] = {}
+        self.rounds_rated: dict[str, int] = {}
+
+    @staticmethod
+    def _percentile(values: numpy.ndarray) -> numpy.ndarray:
+        """
+        Returns:
+            Where every value places between the lowest (0) and highest (1) value, equal values share their place
+        """
+
+        if len(values) < 2:
+            return numpy.full(len(values), 0.5)
+
+        order = numpy.argsort(values, kind="stable")
+        ranks = numpy.empty(len(values), dtype=numpy.float64)
+        ranks[order] = numpy.arange(len(values))
+
+        # Average the ranks of equal values
+        _, inverse, counts = numpy.unique(values, return_inverse=True, return_counts=True)
+        ranks = numpy.bincount(inverse, weights=ranks)[inverse] / counts[inverse]
+
+        return ranks / (len(values) - 1)
+
+    def rate_round(
+            self,
+            player_ids: list[str],
+            team_numbers: numpy.ndarray,
+            stats: numpy.ndarray,
+            team1_win: bool
+    ) -> None:
+        """
+        Args:
+            player_ids: The id of every player in the round
+            team_numbers: The team number (0 is team 1) of every player
+            stats: A (players, 4) array with every player's score, kills, deaths and assists
+            team1_win: If team 1 won the round
+        """
+
+        team_numbers = numpy.asarray(team_numbers)
+        ratings = numpy.fromiter(
+            (self.ratings.get(player_id, self.starting_rating) for player_id in player_ids),
+            dtype=numpy.float64,
+            count=len(player_ids)
+        )
+
+        team1 = team_numbers == 0
+        if team1.all() or not team1.any():
+            # Nobody to be rated against
+            return
+
+        opponent_rating = numpy.where(team1, ratings[~team1].mean(), ratings[team1].mean())
+        expected = 1 / (1 + 10 ** ((opponent_rating - ratings) / self.scale))
+
+        won = (team1 == team1_win).astype(numpy.float64)
+        performance = self._percentile(numpy.asarray(stats, dtype=numpy.float64) @ self.weights)
+        actual = self.team_weight * won + (1 - self.team_weight) * performance
+
+        ratings += self.k_factor * (actual - expected)
+
+        for player_id, rating in zip(player_ids, ratings.tolist()):
+            self.ratings[player_id] = rating
+            self.rounds_rated[player_id] = self.rounds_rated.get(player_id, 0) + 1
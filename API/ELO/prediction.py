@@ -0,0 +1,56 @@
+import numpy
+
+from API.ELO import ELO
+from API.ELO.leaderboard import Leaderboard
+
+
+class PredictionMatrix:
+
+    def __init__(self, leaderboard: Leaderboard, elo: ELO = None):
+        """
+        The expected score of every team against every other team, calculated at once from the leaderboard's ratings
+        and rebuilt on the first lookup after the leaderboard's version changed. The leaderboard only holds committed
+        ratings, see API.Database.Crud.Mordhau.team.sync_leaderboard.
+
+        Args:
+            leaderboard: The ratings to predict from
+            elo: The ELO model to predict with
+        """
+
+        self.leaderboard = leaderboard
+        self.elo = elo or ELO()
+        self.team_index: dict[str, int] = {}
+        self.matrix = numpy.empty((0, 0), dtype=numpy.float64)
+        self._version = None
+
+    def _refresh(self) -> None:
+        if self._version == self.leaderboard.version:
+            return
+
+        self._version = self.leaderboard.version
+        self.team_index = {team_id: index for index, team_id in enumerate(self.leaderboard.teams)}
+        ratings = numpy.fromiter(
+            (elo for elo, _ in self.leaderboard.teams.values()),
+            dtype=numpy.float64,
+            count=len(self.team_index)
+        )
+        # Row team's expected score against the column team
+        self.matrix = self.elo._calculate_expected_score(ratings[:, numpy.newaxis], ratings[numpy.newaxis, :])
+
+    def predict(self, team1_id, team2_id) -> float:
+        """
+        Returns:
+            The expected score of team 1 against team 2, team 2's is 1 minus it
+        """
+        self._refresh()
+        return float(self.matrix[self.team_index[str(team1_id)], self.team_index[str(team2_id)]])
+
+    def predict_many(self, pairs: list[tuple]) -> list[float]:
+        """
+        Returns:
+            The expected score of team 1 for every (team 1 id, team 2 id) pair
+        """
+        self._refresh()
+        team1_index = [self.team_index[str(team1_id)] for team1_id, _ in pairs]
+        team2_index = [self.team_index[str(team2_id)] for _, team2_id in pairs]
+        return self.matrix[team1_index, team2_index].tolist()
@@ -0,0 +1,143 @@
+import numpy
+
+from API.ELO import ELO
+
+
+def schedule_waves(team1_index: numpy.ndarray, team2_index: numpy.ndarray) -> list[slice]:
+    """
+    Splits chronologically ordered matches into consecutive runs (waves) in which no team plays twice, every match in
+    a wave can then be calculated at once without changing the result of a sequential replay.
+
+    Args:
+        team1_index: The rating index of team 1 for every match
+        team2_index: The rating index of team 2 for every match
+
+    Returns:
+        A list of slices over the given arrays, in order
+    """
+
+    waves = []
+    start = 0
+    seen = set()
+
+    for row, (team1, team2) in enumerate(zip(team1_index.tolist(), team2_index.tolist())):
+        if team1 in seen or team2 in seen:
+            waves.append(slice(start, row))
+            start = row
+            seen = set()
+        seen.add(team1)
+        seen.add(team2)
+
+    if start < len(team1_index):
+        waves.append(slice(start, len(team1_index)))
+
+    return waves
+
+
+class Replay:
+
+    def __init__(self, ratings: dict[str, int] = None, starting_elo: int = 1500, elo: ELO = None):
+        """
+        Replays matches against an in-memory rating array, the same way calculate_elo applies them one at a time.
+
+        Args:
+            ratings: Known ratings to start from, keyed by team id
+            starting_elo: The rating given to a team the first time it is seen without a known rating
+            elo: The ELO model to calculate with
+        """
+
+        self.elo = elo or ELO()
+        self.starting_elo = starting_elo
+        self.team_index: dict[str, int] = {}
+        self.ratings = numpy.empty(0, dtype=numpy.float64)
+
+        if ratings:
+            self.ratings = numpy.asarray(list(ratings.values()), dtype=numpy.float64)
+            self.team_index = {str(team_id): index for index, team_id in enumerate(ratings)}
+
+    def index(self, team_ids) -> numpy.ndarray:
+        """
+        Args:
+            team_ids: Team ids to look up
+
+        Returns:
+            The rating index of every given team, teams seen for the first time are added with the starting elo
+        """
+
+        indexes = []
+        for team_id in team_ids:
+            team_id = str(team_id)
+            if (index := self.team_index.get(team_id)) is None:
+                index = self.team_index[team_id] = len(self.team_index)
+            indexes.append(index)
+
+        if len(self.team_index) > len(self.ratings):
+            self.ratings = numpy.concatenate((
+                self.ratings,
+                numpy.full(len(self.team_index) - len(self.ratings), self.starting_elo, dtype=numpy.float64)
+            ))
+
+        return numpy.asarray(indexes, dtype=numpy.int64)
+
+    def apply(
+            self,
+            team1_ids,
+            team2_ids,
+            team1_rounds: numpy.ndarray,
+            team2_rounds: numpy.ndarray,
+            waves: list[slice] = None
+    ) -> dict[str, numpy.ndarray]:
+        """
+        Applies matches in the given (chronological) order. Like calculate_elo every new rating is rounded to a whole
+        number before the next match is played.
+
+        Args:
+            team1_ids: The id of team 1 for every match
+            team2_ids: The id of team 2 for every match
+            team1_rounds: How many rounds team 1 won in every match
+            team2_rounds: How many rounds team 2 won in every match
+            waves: Precomputed schedule_waves output for these matches, calculated when not given
+
+        Returns:
+            A dict with the ratings before ("team1_elo", "team2_elo") and after ("team1", "team2") every match
+        """
+
+        team1_index = self.index(team1_ids)
+        team2_index = self.index(team2_ids)
+        team1_rounds = numpy.asarray(team1_rounds, dtype=numpy.int64)
+        team2_rounds = numpy.asarray(team2_rounds, dtype=numpy.int64)
+
+        result = {
+            "team1_elo": numpy.empty(len(team1_index), dtype=numpy.float64),
+            "team2_elo": numpy.empty(len(team2_index), dtype=numpy.float64),
+            "team1": numpy.empty(len(team1_index), dtype=numpy.float64),
+            "team2": numpy.empty(len(team2_index), dtype=numpy.float64)
+        }
+
+        if waves is None:
+            waves = schedule_waves(team1_index, team2_index)
+
+        for wave in waves:
+            team1_elo = self.ratings[team1_index[wave]]
+            team2_elo = self.ratings[team2_index[wave]]
+
+            new_elo = self.elo.calculate_batch(team1_elo, team2_elo, team1_rounds[wave], team2_rounds[wave])
+            team1_new_elo = numpy.round(new_elo["team1"])
+            team2_new_elo = numpy.round(new_elo["team2"])
+
+            self.ratings[team1_index[wave]] = team1_new_elo
+            self.ratings[team2_index[wave]] = team2_new_elo
+
+            result["team1_elo"][wave] = team1_elo
+            result["team2_elo"][wave] = team2_elo
+            result["team1"][wave] = team1_new_elo
+            result["team2"][wave] = team2_new_elo
+
+        return result
+
+    def snapshot(self) -> dict[str, int]:
+        """
+        Returns:
+            Every known rating keyed by team id
+        """
+        return {team_id: int(self.ratings[index]) for team_id, index in self.team_index.items()}
@@ -0,0 +1,379 @@
+"""
+Monte Carlo simulation of a playoff bracket or the rest of a season with the ELO model. Every round of a match is won
+by team 1 with its expected score, ratings are updated after every simulated match like calculate_elo would.
+
+Usage:
+    python -m API.ELO.simulation bracket TEAM_ID TEAM_ID [TEAM_ID ...] --trials 100000 --seed 1
+    python -m API.ELO.simulation season fixtures.json --trials 100000 --seed 1
+
+A bracket is given in seeding order and padded with byes up to a power of two. It's seeded the standard way, the top
+seed plays the bottom seed in the first round (1 vs 8, 4 vs 5, 2 vs 7, 3 vs 6 for eight teams), so byes go to the top
+seeds and the top two seeds can only meet in the final. A fixtures file is a JSON list of [team1_id, team2_id] pairs
+in the order they will be played, finishing positions of a season are by final elo.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy
+
+from API.ELO import ELO
+from API.ELO.replay import schedule_waves
+
+BYE = -1
+
+# Shared by every simulation of the process, created on first use. Workers are spawned rather than forked, forking
+# copies the running event loop and the database connections of the API.
+_executor: ProcessPoolExecutor = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def bracket_slots(teams: int) -> numpy.ndarray:
+    """
+    Returns:
+        The 0 based seed in every slot of a standard single elimination bracket for the given amount of teams, padded
+        with BYE up to a power of two. Neighbouring slots play each other in the first round.
+    """
+
+    seeds = [1]
+    while len(seeds) < max(2, teams):
+        seeds = [seed for top in seeds for seed in (top, 2 * len(seeds) + 1 - top)]
+
+    return numpy.asarray([seed - 1 if seed <= teams else BYE for seed in seeds], dtype=numpy.int64)
+
+
+def play_matches(
+        rng: numpy.random.Generator,
+        team1_expected_score: numpy.ndarray,
+        sets_to_win: int = 3,
+        rounds_to_win: int = 7
+) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Plays out matches of first to sets_to_win sets, where a set is first to rounds_to_win rounds
+
+    Args:
+        rng: The random generator to play with
+        team1_expected_score: Team 1's chance of winning each round, one per match
+
+    Returns:
+        The rounds won by team 1, the rounds won by team 2 and if team 1 won, per match
+    """
+
+    matches = len(team1_expected_score)
+    team1_rounds = numpy.zeros(matches, dtype=numpy.int64)
+    team2_rounds = numpy.zeros(matches, dtype=numpy.int64)
+    team1_sets = numpy.zeros(matches, dtype=numpy.int64)
+    team2_sets = numpy.zeros(matches, dtype=numpy.int64)
+
+    # A set can't go past this many rounds
+    max_rounds = 2 * rounds_to_win - 1
+    rounds_played = numpy.arange(1, max_rounds + 1)
+
+    for _ in range(2 * sets_to_win - 1):
+        playing = (team1_sets < sets_to_win) & (team2_sets < sets_to_win)
+        if not playing.any():
+            break
+
+        team1_wins = numpy.cumsum(rng.random((matches, max_rounds)) < team1_expected_score[:, numpy.newaxis], axis=1)
+        team2_wins = rounds_played - team1_wins
+        last_round = numpy.argmax((team1_wins >= rounds_to_win) | (team2_wins >= rounds_to_win), axis=1)
+
+        set_team1_rounds = numpy.where(playing, team1_wins[numpy.arange(matches), last_round], 0)
+        set_team2_rounds = numpy.where(playing, last_round + 1, 0) - set_team1_rounds
+
+        team1_rounds += set_team1_rounds
+        team2_rounds += set_team2_rounds
+        team1_sets += set_team1_rounds > set_team2_rounds
+        team2_sets += set_team2_rounds > set_team1_rounds
+
+    return team1_rounds, team2_rounds, team1_sets > team2_sets
+
+
+def _play_and_rate(elo: ELO, rng: numpy.random.Generator, team1_elo: numpy.ndarray, team2_elo: numpy.ndarray,
+                   sets_to_win: int, rounds_to_win: int) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Returns:
+        The new elo of team 1, the new elo of team 2 and if team 1 won, per match
+    """
+
+    team1_rounds, team2_rounds, team1_won = play_matches(
+        rng, elo._calculate_expected_score(team1_elo, team2_elo), sets_to_win, rounds_to_win
+    )
+    new_elo = elo.calculate_batch(team1_elo, team2_elo, team1_rounds, team2_rounds)
+
+    return numpy.round(new_elo["team1"]), numpy.round(new_elo["team2"]), team1_won
+
+
+def _bracket_batch(
+        trials: int,
+        seed: numpy.random.SeedSequence,
+        ratings: numpy.ndarray,
+        slots: numpy.ndarray,
+        elo: ELO,
+        sets_to_win: int,
+        rounds_to_win: int
+) -> numpy.ndarray:
+    """
+    Returns:
+        How often each team was knocked out in each bracket round, a (teams, bracket rounds + 1) array where the last
+        column counts championships
+    """
+
+    rng = numpy.random.default_rng(seed)
+    bracket_rounds = int(numpy.log2(len(slots)))
+
+    trial_ratings = numpy.tile(ratings, (trials, 1))
+    knocked_out = numpy.full((trials, len(ratings)), bracket_rounds, dtype=numpy.int64)
+    remaining = numpy.tile(slots, (trials, 1))
+
+    for bracket_round in range(bracket_rounds):
+        team1 = remaining[:, 0::2].ravel()
+        team2 = remaining[:, 1::2].ravel()
+        trial = numpy.repeat(numpy.arange(trials), remaining.shape[1] // 2)
+
+        winners = numpy.where(team2 == BYE, team1, team2)
+        played = (team1 != BYE) & (team2 != BYE)
+
+        if played.any():
+            trial, team1, team2 = trial[played], team1[played], team2[played]
+
+            team1_new_elo, team2_new_elo, team1_won = _play_and_rate(
+                elo, rng, trial_ratings[trial, team1], trial_ratings[trial, team2], sets_to_win, rounds_to_win
+            )
+            trial_ratings[trial, team1] = team1_new_elo
+            trial_ratings[trial, team2] = team2_new_elo
+
+            winners[played] = numpy.where(team1_won, team1, team2)
+            knocked_out[trial, numpy.where(team1_won, team2, team1)] = bracket_round
+
+        remaining = winners.reshape(trials, -1)
+
+    counts = numpy.zeros((len(ratings), bracket_rounds + 1), dtype=numpy.int64)
+    for team in numpy.unique(slots[slots != BYE]):
+        counts[team] = numpy.bincount(knocked_out[:, team], minlength=bracket_rounds + 1)
+
+    return counts
+
+
+def _season_batch(
+        trials: int,
+        seed: numpy.random.SeedSequence,
+        ratings: numpy.ndarray,
+        team1_index: numpy.ndarray,
+        team2_index: numpy.ndarray,
+        waves: list[slice],
+        elo: ELO,
+        sets_to_win: int,
+        rounds_to_win: int
+) -> numpy.ndarray:
+    """
+    Returns:
+        How often each team finished in each position, a (teams, teams) array
+    """
+
+    rng = numpy.random.default_rng(seed)
+    trial_ratings = numpy.tile(ratings, (trials, 1))
+
+    # Fixtures within a wave don't share a team, so they can all be played at once
+    for wave in waves:
+        team1, team2 = team1_index[wave], team2_index[wave]
+
+        team1_new_elo, team2_new_elo, _ = _play_and_rate(
+            elo, rng, trial_ratings[:, team1].ravel(), trial_ratings[:, team2].ravel(), sets_to_win, rounds_to_win
+        )
+        trial_ratings[:, team1] = team1_new_elo.reshape(trials, -1)
+        trial_ratings[:, team2] = team2_new_elo.reshape(trials, -1)
+
+    teams = len(ratings)
+    standings = numpy.argsort(-trial_ratings, axis=1, kind="stable")
+    positions = numpy.tile(numpy.arange(teams), trials)
+
+    return numpy.bincount(standings.ravel() * teams + positions, minlength=teams * teams).reshape(teams, teams)
+
+
+def _run(batch, trials: int, seed: int = None, workers: int = None, batch_size: int = 10000) -> numpy.ndarray:
+    """
+    Splits the trials into batches with their own seed spawned from the given seed, so results only depend on the
+    seed and the batch size and not on how many workers ran them. Without a given amount of workers the batches run on
+    the shared process pool.
+    """
+
+    batches = [min(batch_size, trials - start) for start in range(0, trials, batch_size)]
+    seeds = numpy.random.SeedSequence(seed).spawn(len(batches))
+
+    if workers == 1 or len(batches) == 1:
+        return sum(map(batch, batches, seeds))
+
+    if workers is None:
+        return sum(_get_executor().map(batch, batches, seeds))
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return sum(executor.map(batch, batches, seeds))
+
+
+def simulate_bracket(
+        team_ids: list[str],
+        ratings: list[float],
+        trials: int = 10000,
+        seed: int = None,
+        sets_to_win: int = 3,
+        rounds_to_win: int = 7,
+        elo: ELO = None,
+        workers: int = None
+) -> dict[str, dict[str, float]]:
+    """
+    Args:
+        team_ids: The teams in seeding order, see the module documentation
+        ratings: The current elo of every team
+
+    Returns:
+        Every team's probability of each finishing position ("1", "2", "3-4", "5-8", ...), keyed by team id
+    """
+
+    slots = bracket_slots(len(team_ids))
+
+    counts = _run(
+        partial(
+            _bracket_batch,
+            ratings=numpy.asarray(ratings, dtype=numpy.float64),
+            slots=slots,
+            elo=elo or ELO(),
+            sets_to_win=sets_to_win,
+            rounds_to_win=rounds_to_win
+        ),
+        trials,
+        seed=seed,
+        workers=workers
+    )
+
+    bracket_rounds = counts.shape[1] - 1
+    positions = [
+        f"{2 ** (bracket_rounds - knocked_out - 1) + 1}-{2 ** (bracket_rounds - knocked_out)}"
+        for knocked_out in range(bracket_rounds)
+    ] + ["1"]
+    positions[-2] = "2"
+
+    return {
+        str(team_id): {position: count / trials for position, count in zip(positions, counts[team].tolist())}
+        for team, team_id in enumerate(team_ids)
+    }
+
+
+def simulate_season(
+        team_ids: list[str],
+        ratings: list[float],
+        fixtures: list[tuple[str, str]],
+        trials: int = 10000,
+        seed: int = None,
+        sets_to_win: int = 3,
+        rounds_to_win: int = 7,
+        elo: ELO = None,
+        workers: int = None
+) -> dict[str, dict[str, float]]:
+    """
+    Args:
+        team_ids: Every team in the standings
+        ratings: The current elo of every team
+        fixtures: The remaining (team1_id, team2_id) matches in the order they will be played
+
+    Returns:
+        Every team's probability of each finishing position ("1", "2", ...) by elo, keyed by team id
+    """
+
+    team_index = {str(team_id): index for index, team_id in enumerate(team_ids)}
+    team1_index = numpy.asarray([team_index[str(team1_id)] for team1_id, _ in fixtures], dtype=numpy.int64)
+    team2_index = numpy.asarray([team_index[str(team2_id)] for _, team2_id in fixtures], dtype=numpy.int64)
+
+    counts = _run(
+        partial(
+            _season_batch,
+            ratings=numpy.asarray(ratings, dtype=numpy.float64),
+            team1_index=team1_index,
+            team2_index=team2_index,
+            waves=schedule_waves(team1_index, team2_index),
+            elo=elo or ELO(),
+            sets_to_win=sets_to_win,
+            rounds_to_win=rounds_to_win
+        ),
+        trials,
+        seed=seed,
+        workers=workers
+    )
+
+    return {
+        str(team_id): {str(position): count / trials for position, count in enumerate(counts[team].tolist(), start=1)}
+        for team, team_id in enumerate(team_ids)
+    }
+
+
+async def load_ratings(team_ids: list[str] = None) -> dict[str, int]:
+    from API.Database import BaseDB
+    from API.Database.Crud.Mordhau.team import get_team_elos
+
+    await BaseDB.db.connect()
+    try:
+        return await get_team_elos(team_ids)
+    finally:
+        await BaseDB.db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m API.ELO.simulation", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--trials", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--sets-to-win", type=int, default=3)
+    parser.add_argument("--rounds-to-win", type=int, default=7)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to every core")
+
+    simulations = parser.add_subparsers(dest="simulation", required=True)
+
+    bracket = simulations.add_parser("bracket", help="Simulate a single elimination bracket")
+    bracket.add_argument("team_ids", nargs="+", help="Team ids in seeding order")
+
+    season = simulations.add_parser("season", help="Simulate the remaining fixtures of a season")
+    season.add_argument("fixtures", help="A JSON file with a list of [team1_id, team2_id] pairs")
+
+    args = parser.parse_args()
+    options = {
+        "trials": args.trials,
+        "seed": args.seed,
+        "sets_to_win": args.sets_to_win,
+        "rounds_to_win": args.rounds_to_win,
+        "workers": args.workers
+    }
+
+    if args.simulation == "bracket":
+        ratings = asyncio.run(load_ratings(args.team_ids))
+        result = simulate_bracket(args.team_ids, [ratings[team_id] for team_id in args.team_ids], **options)
+    else:
+        with open(args.fixtures) as f:
+            fixtures = json.load(f)
+        ratings = asyncio.run(load_ratings())
+        result = simulate_season(list(ratings), list(ratings.values()), fixtures, **options)
+
+    print(json.dumps(result, indent=4))
+
+
+if __name__ == "__main__":
+    main()
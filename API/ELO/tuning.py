@@ -0,0 +1,191 @@
+"""
+Scores ELO parameters against the match history by how well the expected score of every match predicted the share of
+rounds team 1 actually won.
+
+Usage:
+    python -m API.ELO.tuning grid --volatility 100 150 200 --gain-ceiling 300 400 500 --multiplication-factor 15 25
+    python -m API.ELO.tuning random --samples 2000 --seed 1 --output report.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from API.ELO import ELO
+from API.ELO.replay import Replay
+from API.ELO.replay import schedule_waves
+
+METRICS = ("log_loss", "brier")
+
+# Set in every pool worker by _set_history so the history is only sent to a worker once
+_history: dict = {}
+
+
+async def load_history(starting_elo: int = 1500) -> dict:
+    """
+    Loads every elo calculated match that had rounds played into compact arrays, in chronological order
+    """
+
+    from API.Database import BaseDB
+    from API.Database.Crud.Mordhau.elo import iterate_match_results
+
+    team_index = {}
+    team1_index, team2_index, team1_rounds, team2_rounds = [], [], [], []
+
+    await BaseDB.db.connect()
+    try:
+        async for batch in iterate_match_results():
+            for match in batch:
+                if not match["team1_rounds_won"] + match["team2_rounds_won"]:
+                    continue
+                team1_index.append(team_index.setdefault(str(match["team1_id"]), len(team_index)))
+                team2_index.append(team_index.setdefault(str(match["team2_id"]), len(team_index)))
+                team1_rounds.append(match["team1_rounds_won"])
+                team2_rounds.append(match["team2_rounds_won"])
+    finally:
+        await BaseDB.db.disconnect()
+
+    history = {
+        "starting_elo": starting_elo,
+        "team1_index": numpy.asarray(team1_index, dtype=numpy.int32),
+        "team2_index": numpy.asarray(team2_index, dtype=numpy.int32),
+        "team1_rounds": numpy.asarray(team1_rounds, dtype=numpy.int32),
+        "team2_rounds": numpy.asarray(team2_rounds, dtype=numpy.int32),
+    }
+    history["waves"] = schedule_waves(history["team1_index"], history["team2_index"])
+
+    return history
+
+
+def _set_history(history: dict) -> None:
+    _history.update(history)
+
+
+def evaluate(parameters: dict) -> dict:
+    """
+    Replays the loaded history with the given ELO parameters
+
+    Returns:
+        The parameters with the log loss and brier score of the expected scores before every match
+    """
+
+    elo = ELO(**parameters)
+    replay = Replay(starting_elo=_history["starting_elo"], elo=elo)
+
+    result = replay.apply(
+        _history["team1_index"],
+        _history["team2_index"],
+        _history["team1_rounds"],
+        _history["team2_rounds"],
+        waves=_history["waves"]
+    )
+
+    team1_rounds = _history["team1_rounds"].astype(numpy.float64)
+    actual = team1_rounds / (team1_rounds + _history["team2_rounds"])
+    expected = numpy.clip(elo._calculate_expected_score(result["team1_elo"], result["team2_elo"]), 1e-12, 1 - 1e-12)
+
+    return {
+        **parameters,
+        "log_loss": float(-numpy.mean(actual * numpy.log(expected) + (1 - actual) * numpy.log(1 - expected))),
+        "brier": float(numpy.mean((expected - actual) ** 2))
+    }
+
+
+def tune(history: dict, candidates: list[dict], metric: str = "log_loss", workers: int = None) -> list[dict]:
+    """
+    Evaluates every candidate across a process pool
+
+    Returns:
+        The evaluated candidates, best (lowest) metric first
+    """
+
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(candidates) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_set_history, initargs=(history,)) as executor:
+        report = list(executor.map(evaluate, candidates, chunksize=chunksize))
+
+    return sorted(report, key=lambda candidate: candidate[metric])
+
+
+def grid_candidates(volatility: list[int], gain_ceiling: list[int], multiplication_factor: list[int]) -> list[dict]:
+    return [
+        {"volatility": v, "gain_ceiling": g, "multiplication_factor": m}
+        for v, g, m in itertools.product(volatility, gain_ceiling, multiplication_factor)
+    ]
+
+
+def random_candidates(
+        samples: int,
+        volatility: tuple[int, int],
+        gain_ceiling: tuple[int, int],
+        multiplication_factor: tuple[int, int],
+        seed: int = None
+) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "volatility": rng.uniform(*volatility),
+            "gain_ceiling": rng.uniform(*gain_ceiling),
+            "multiplication_factor": rng.uniform(*multiplication_factor)
+        }
+        for _ in range(samples)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m API.ELO.tuning", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--metric", choices=METRICS, default="log_loss", help="The metric to rank by")
+    parser.add_argument("--starting-elo", type=int, default=1500, help="The elo every team starts the history with")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to every core")
+    parser.add_argument("--top", type=int, default=20, help="How many candidates to print")
+    parser.add_argument("--output", help="Write the full ranked report to this JSON file")
+
+    searches = parser.add_subparsers(dest="search", required=True)
+
+    grid = searches.add_parser("grid", help="Evaluate every combination of the given values")
+    grid.add_argument("--volatility", type=int, nargs="+", default=[100, 125, 150, 175, 200])
+    grid.add_argument("--gain-ceiling", type=int, nargs="+", default=[300, 350, 400, 450, 500])
+    grid.add_argument("--multiplication-factor", type=int, nargs="+", default=[15, 20, 25, 30, 35])
+
+    sample = searches.add_parser("random", help="Evaluate values sampled uniformly from the given ranges")
+    sample.add_argument("--samples", type=int, default=1000)
+    sample.add_argument("--seed", type=int, default=None)
+    sample.add_argument("--volatility", type=int, nargs=2, default=[50, 300])
+    sample.add_argument("--gain-ceiling", type=int, nargs=2, default=[200, 800])
+    sample.add_argument("--multiplication-factor", type=int, nargs=2, default=[0, 50])
+
+    args = parser.parse_args()
+
+    if args.search == "grid":
+        candidates = grid_candidates(args.volatility, args.gain_ceiling, args.multiplication_factor)
+    else:
+        candidates = random_candidates(
+            args.samples, args.volatility, args.gain_ceiling, args.multiplication_factor, seed=args.seed
+        )
+
+    history = asyncio.run(load_history(args.starting_elo))
+    print(f"Loaded {len(history['team1_index'])} matches, evaluating {len(candidates)} candidates")
+
+    report = tune(history, candidates, metric=args.metric, workers=args.workers)
+
+    print(f"{'rank':>4}  {'volatility':>10}  {'gain_ceiling':>12}  {'multiplication_factor':>21}  "
+          f"{'log_loss':>8}  {'brier':>8}")
+    for rank, candidate in enumerate(report[:args.top], start=1):
+        print(f"{rank:>4}  {candidate['volatility']:>10.2f}  {candidate['gain_ceiling']:>12.2f}  "
+              f"{candidate['multiplication_factor']:>21.2f}  {candidate['log_loss']:>8.5f}  {candidate['brier']:>8.5f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
+import asyncio
 import logging
 from typing import Optional
 from datetime import datetime
+from functools import partial
 
 from fastapi import APIRouter
 from fastapi import Depends
@@ -8,6 +10,7 @@ from fastapi import status
 from fastapi import Query
 
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
 
 from pydantic import UUID4
 
@@ -17,16 +20,40 @@ from API.Database.Crud.Mordhau.Game.match import get_match_by_id
 from API.Database.Crud.Mordhau.Game.match import get_matches_by_team_ids
 from API.Database.Crud.Mordhau.Game.match import get_matches_by_team_id
 from API.Database.Crud.Mordhau.Game.match import get_matches
+from API.Database.Crud.Mordhau.Game.match import get_matches_page
+from API.Database.Crud.Mordhau.Game.match import export_matches
 from API.Database.Crud.Mordhau.Game.match import create_match
 from API.Database.Crud.Mordhau.Game.match import calculate_elo
+from API.Database.Crud.Mordhau.Game.match import ingest_match
+from API.Database.Crud.Mordhau.Game.head_to_head import get_head_to_head
+from API.Database.Crud.Mordhau.Game.head_to_head import get_head_to_head_page
+from API.Database.Crud.Mordhau.Game.tree import match_trees_json
+from API.Database.Crud.Mordhau.elo import replay_elo
+from API.Database.Crud.Mordhau.elo import replay_elo_from
+from API.Database.Crud.Mordhau.elo import calculate_pending_elo
+from API.Database.Crud.Mordhau.team import get_predictions
+from API.Database.Crud.Mordhau.team import get_team_elos
 from API.Database.Crud.User.user import check_user
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import MAX_PAGE_SIZE
 
 from API.Schemas import BaseSchema
+from API.Schemas import Page
 from API.Schemas.Mordhau.Game.match import Match
 from API.Schemas.Mordhau.Game.match import MatchInDB
+from API.Schemas.Mordhau.Game.match import IngestMatch
+from API.Schemas.Mordhau.Game.match import HeadToHead
+from API.Schemas.Mordhau.Game.match import MatchPrediction
+from API.Schemas.Mordhau.Game.match import MatchPredictionsTeams
+from API.Schemas.Mordhau.Game.match import SimulateBracket
+from API.Schemas.Mordhau.Game.match import SimulateSeason
+from API.Schemas.Mordhau.Game.match import SimulationResult
 
 from API.Endpoints import BaseEndpoint
 
+from API.ELO.simulation import simulate_bracket
+from API.ELO.simulation import simulate_season
+
 log = logging.getLogger(__name__)
 
 
@@ -47,24 +74,141 @@ class Match(BaseEndpoint):
 
     @staticmethod
     @route.get("/get-matches-by-teams", tags=tags, response_model=list[MatchInDB])
-    async def get_matches_by_team_ids(team1_id, team2_id):
-        return get_matches_by_team_ids(team1_id, team2_id)
+    async def get_matches_by_team_ids(team1_id: UUID4, team2_id: UUID4):
+        return await get_matches_by_team_ids(team1_id, team2_id)
 
     @staticmethod
     @route.get("/get-matches-by-team-id", tags=tags, response_model=list[MatchInDB])
-    async def get_matches_by_team_id(team_id):
-        return get_matches_by_team_id(team_id)
+    async def get_matches_by_team_id(team_id: UUID4):
+        return await get_matches_by_team_id(team_id)
+
+    @staticmethod
+    @route.get("/head-to-head", tags=tags, response_model=Page[MatchInDB])
+    async def head_to_head(team1_id: UUID4, team2_id: UUID4,
+                           cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+                           limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+        """
+        The matches between two teams whichever side each played on, oldest first
+        """
+
+        return await get_head_to_head_page(team1_id, team2_id, cursor=cursor, limit=limit)
+
+    @staticmethod
+    @route.get("/head-to-head-summary", tags=tags, response_model=HeadToHead)
+    async def head_to_head_summary(team1_id: UUID4, team2_id: UUID4):
+        return await get_head_to_head(team1_id, team2_id)
+
+    @staticmethod
+    @route.get("/predict", tags=tags, response_model=MatchPrediction)
+    async def predict(team1_id: UUID4, team2_id: UUID4):
+        try:
+            expected_score = (await get_predictions()).predict(team1_id, team2_id)
+        except KeyError as error:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Team with id {error.args[0]} not found"
+            )
+        return MatchPrediction(
+            team1_id=team1_id,
+            team2_id=team2_id,
+            team1_expected_score=expected_score,
+            team2_expected_score=1 - expected_score
+        )
+
+    @staticmethod
+    @route.post("/predict-bulk", tags=tags, response_model=list[MatchPrediction])
+    async def predict_bulk(matches: MatchPredictionsTeams):
+        predictions = await get_predictions()
+        try:
+            expected_scores = predictions.predict_many([(match.team1_id, match.team2_id) for match in matches.matches])
+        except KeyError as error:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Team with id {error.args[0]} not found"
+            )
+        return [
+            MatchPrediction(
+                team1_id=match.team1_id,
+                team2_id=match.team2_id,
+                team1_expected_score=expected_score,
+                team2_expected_score=1 - expected_score
+            )
+            for match, expected_score in zip(matches.matches, expected_scores)
+        ]
+
+    @staticmethod
+    @route.post("/simulate-bracket", tags=tags, response_model=SimulationResult)
+    async def simulate_bracket(bracket: SimulateBracket, auth=Depends(JWTBearer())):
+        await check_user(token=auth[0], user_id=auth[-1])
+        team_ids = [str(team_id) for team_id in bracket.team_ids]
+        ratings = await get_team_elos(team_ids)
+
+        positions = await asyncio.get_running_loop().run_in_executor(None, partial(
+            simulate_bracket,
+            team_ids,
+            [ratings[team_id] for team_id in team_ids],
+            trials=bracket.trials,
+            seed=bracket.seed,
+            sets_to_win=bracket.sets_to_win,
+            rounds_to_win=bracket.rounds_to_win
+        ))
+        return SimulationResult(trials=bracket.trials, positions=positions)
+
+    @staticmethod
+    @route.post("/simulate-season", tags=tags, response_model=SimulationResult)
+    async def simulate_season(season: SimulateSeason, auth=Depends(JWTBearer())):
+        await check_user(token=auth[0], user_id=auth[-1])
+        ratings = await get_team_elos()
+        fixtures = [(str(fixture.team1_id), str(fixture.team2_id)) for fixture in season.fixtures]
+
+        for team_id in {team_id for fixture in fixtures for team_id in fixture}:
+            if team_id not in ratings:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Team with id {team_id} not found"
+                )
+
+        positions = await asyncio.get_running_loop().run_in_executor(None, partial(
+            simulate_season,
+            list(ratings),
+            list(ratings.values()),
+            fixtures,
+            trials=season.trials,
+            seed=season.seed,
+            sets_to_win=season.sets_to_win,
+            rounds_to_win=season.rounds_to_win
+        ))
+        return SimulationResult(trials=season.trials, positions=positions)
 
     @staticmethod
     @route.get("/all", tags=tags, response_model=list[MatchInDB])
     async def get_all_matches(start_time: Optional[datetime] = Query(None, title="ISO 8601 Timestamp", Optional=True),
-                              end_time: Optional[datetime] = Query(None, title="ISO 8601 Timestamp", Optional=True)):
+                              end_time: Optional[datetime] = Query(None, title="ISO 8601 Timestamp", Optional=True),
+                              passthrough: bool = Query(False, description="Stream the JSON built by the database")):
         if start_time and not end_time or end_time and not start_time:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail=f"Both a start and end time MUST be supplied if a date is given!")
+        if passthrough:
+            return StreamingResponse(match_trees_json(start_time, end_time), media_type="application/json")
         matches = await get_matches(start_time, end_time)
         return matches
 
+    @staticmethod
+    @route.get("/page", tags=tags, response_model=Page[MatchInDB])
+    async def page(cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+                   limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+        return await get_matches_page(cursor=cursor, limit=limit)
+
+    @staticmethod
+    @route.get("/export", tags=tags, response_class=StreamingResponse)
+    async def export(start_time: Optional[datetime] = Query(None, title="ISO 8601 Timestamp"),
+                     end_time: Optional[datetime] = Query(None, title="ISO 8601 Timestamp")):
+        """
+        Every match row without its sets as newline delimited JSON, streamed from a database cursor
+        """
+
+        return StreamingResponse(export_matches(start_time, end_time), media_type="application/x-ndjson")
+
     @staticmethod
     @route.post("/create-match", tags=tags, response_model=BaseSchema)
     async def create_match(match: Match, auth=Depends(JWTBearer())):
@@ -80,9 +224,66 @@ class Match(BaseEndpoint):
             ]
         )
 
+    @staticmethod
+    @route.post("/ingest", tags=tags, response_model=BaseSchema)
+    async def ingest(match: IngestMatch,
+                     calculate_elo: bool = Query(False, description="Calculate the elo of both teams afterwards"),
+                     auth=Depends(JWTBearer())):
+        await check_user(token=auth[0], user_id=auth[-1])
+        match_id, new_elo = await ingest_match(match, calculate=calculate_elo)
+        log.info(f"User \"{auth[-1]}\" ingested a match \"{match_id}\" with {len(match.sets)} sets")
+        return BaseSchema(
+            message=f"Created match with id: {match_id}",
+            extra=[
+                {
+                    "match_id": match_id,
+                    "New ELO": new_elo
+                }
+            ]
+        )
+
     @staticmethod
     @route.post("/calculate-match-elo", tags=tags, response_model=BaseSchema)
     async def calculate_match_elo(match_id: UUID4, auth=Depends(JWTBearer())):
         await check_user(token=auth[0], user_id=auth[-1])
         calculated_elo = await calculate_elo(match_id)
         return BaseSchema(message="Updated elo.", extra=[{"New ELO": calculated_elo}])
+
+    @staticmethod
+    @route.post("/calculate-pending", tags=tags, response_model=BaseSchema)
+    async def calculate_pending(auth=Depends(JWTBearer())):
+        await check_user(token=auth[0], user_id=auth[-1])
+        calculated = await calculate_pending_elo()
+        log.info(f"User \"{auth[-1]}\" calculated the elo of {calculated['matches']} pending matches")
+        return BaseSchema(
+            message=f"Calculated the elo of {calculated['matches']} matches.",
+            extra=[calculated]
+        )
+
+    @staticmethod
+    @route.post("/replay-elo", tags=tags, response_model=BaseSchema)
+    async def replay_elo(starting_elo: Optional[int] = None,
+                         checkpoint_interval: Optional[int] = Query(None, gt=0),
+                         auth=Depends(JWTBearer())):
+        await check_user(token=auth[0], user_id=auth[-1])
+        log.info(f"User \"{auth[-1]}\" issued an elo replay of every match"
+                 + (f" starting at {starting_elo} elo" if starting_elo is not None else ""))
+        replayed = await replay_elo(starting_elo=starting_elo, checkpoint_interval=checkpoint_interval)
+        return BaseSchema(
+            message=f"Replayed {replayed['matches']} matches.",
+            extra=[{"New ELO": replayed["ratings"]}]
+        )
+
+    @staticmethod
+    @route.post("/replay-elo-from", tags=tags, response_model=BaseSchema)
+    async def replay_elo_from(match_id: UUID4,
+                              starting_elo: Optional[int] = None,
+                              checkpoint_interval: Optional[int] = Query(None, gt=0),
+                              auth=Depends(JWTBearer())):
+        await check_user(token=auth[0], user_id=auth[-1])
+        log.info(f"User \"{auth[-1]}\" issued an elo replay from match \"{match_id}\"")
+        replayed = await replay_elo_from(match_id, starting_elo=starting_elo, checkpoint_interval=checkpoint_interval)
+        return BaseSchema(
+            message=f"Replayed {replayed['matches']} matches.",
+            extra=[{"New ELO": replayed["ratings"]}]
+        )
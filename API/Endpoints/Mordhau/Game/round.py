@@ -2,30 +2,40 @@ import logging
 
 import logging
 
+from typing import Optional
+
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import status
+from fastapi import Query
 
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
 
 from pydantic import UUID4
 
 from API.Auth import JWTBearer
 
 from API.Database.Crud.User.user import check_user
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import MAX_PAGE_SIZE
 
 from API.Database.Crud.Mordhau.Game.round import get_round_by_id
 from API.Database.Crud.Mordhau.Game.round import get_rounds_by_set_id
 from API.Database.Crud.Mordhau.Game.round import get_rounds
+from API.Database.Crud.Mordhau.Game.round import get_rounds_page
 from API.Database.Crud.Mordhau.Game.round import create_round
 
 from API.Database.Crud.Mordhau.Game.round_player import get_round_player_by_id
 from API.Database.Crud.Mordhau.Game.round_player import get_round_played_by_id
 from API.Database.Crud.Mordhau.Game.round_player import get_round_players
+from API.Database.Crud.Mordhau.Game.round_player import get_round_players_page
+from API.Database.Crud.Mordhau.Game.round_player import export_round_players
 from API.Database.Crud.Mordhau.Game.round_player import create_round_player
 from API.Database.Crud.Mordhau.Game.round_player import create_all_round_players
 
 from API.Schemas import BaseSchema
+from API.Schemas import Page
 from API.Schemas.Mordhau.Game.round import RoundInDB
 from API.Schemas.Mordhau.Game.round import RoundPlayerInDB
 from API.Schemas.Mordhau.Game.round import CreateRoundPlayer
@@ -62,6 +72,12 @@ class Round(BaseEndpoint):
     async def get_all_rounds():
         return await get_rounds()
 
+    @staticmethod
+    @route.get("/round-page", tags=tags, response_model=Page[RoundInDB])
+    async def round_page(cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+                         limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+        return await get_rounds_page(cursor=cursor, limit=limit)
+
     @staticmethod
     @route.post("/create-round", tags=tags, response_model=BaseSchema)
     async def create_round(round: Round, auth=Depends(JWTBearer())):
@@ -91,6 +107,23 @@ class Round(BaseEndpoint):
     async def get_all_round_players():
         return await get_round_players()
 
+    @staticmethod
+    @route.get("/round-players-page", tags=tags, response_model=Page[RoundPlayerInDB])
+    async def round_players_page(
+            cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    ):
+        return await get_round_players_page(cursor=cursor, limit=limit)
+
+    @staticmethod
+    @route.get("/round-players-export", tags=tags, response_class=StreamingResponse)
+    async def round_players_export():
+        """
+        Every round player row as newline delimited JSON, streamed from a database cursor
+        """
+
+        return StreamingResponse(export_round_players(), media_type="application/x-ndjson")
+
     @staticmethod
     @route.post("/create-round-players", tags=tags, response_model=BaseSchema)  # Shit endpoint name, pls god rename
     async def create_round_all(round_players: CreateRoundPlayers, auth=Depends(JWTBearer())):
@@ -1,8 +1,11 @@
 import logging
 
+from typing import Optional
+
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import status
+from fastapi import Query
 
 from fastapi.exceptions import HTTPException
 
@@ -14,12 +17,20 @@ from API.Database.Crud.Mordhau.Game.set import get_set_by_id
 from API.Database.Crud.Mordhau.Game.set import get_sets_by_match_id
 from API.Database.Crud.Mordhau.Game.set import get_sets_by_map
 from API.Database.Crud.Mordhau.Game.set import get_sets
+from API.Database.Crud.Mordhau.Game.set import get_sets_page
 from API.Database.Crud.Mordhau.Game.set import create_set
+from API.Database.Crud.Mordhau.Game.map_stats import get_map_stats
+from API.Database.Crud.Mordhau.Game.map_stats import get_map_matrix
 from API.Database.Crud.User.user import check_user
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import MAX_PAGE_SIZE
 
 from API.Schemas import BaseSchema
+from API.Schemas import Page
 from API.Schemas.Mordhau.Game.set import SetInDB
 from API.Schemas.Mordhau.Game.set import Set as SchemaSet
+from API.Schemas.Mordhau.Game.set import MapStats
+from API.Schemas.Mordhau.Game.set import MapMatrix
 
 from API.Endpoints import BaseEndpoint
 
@@ -49,13 +60,29 @@ class Set(BaseEndpoint):
     @staticmethod
     @route.get("/by-map", tags=tags, response_model=list[SetInDB])
     async def get_sets_by_map(map_name: str):
-        return get_sets_by_map(map_name)
+        return await get_sets_by_map(map_name)
+
+    @staticmethod
+    @route.get("/map-stats", tags=tags, response_model=list[MapStats])
+    async def map_stats(map_name: Optional[str] = Query(None, description="Only this map")):
+        return await get_map_stats(map_name)
+
+    @staticmethod
+    @route.get("/map-matrix", tags=tags, response_model=MapMatrix)
+    async def map_matrix():
+        return await get_map_matrix()
 
     @staticmethod
     @route.get("/all", tags=tags, response_model=list[SetInDB])
     async def get_all_sets():
         return await get_sets()
 
+    @staticmethod
+    @route.get("/page", tags=tags, response_model=Page[SetInDB])
+    async def page(cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+                   limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+        return await get_sets_page(cursor=cursor, limit=limit)
+
     @staticmethod
     @route.post("/create-set", tags=tags, response_model=BaseSchema)
     async def create_set(input_set: SchemaSet, auth=Depends(JWTBearer())):
@@ -1,6 +1,7 @@
 import logging
 
 from typing import List
+from typing import Optional
 
 from fastapi import APIRouter
 from fastapi import Depends
@@ -16,6 +17,7 @@ from API.Auth import JWTBearer
 from API.Endpoints import BaseEndpoint
 
 from API.Database.Crud.Mordhau.player import get_players
+from API.Database.Crud.Mordhau.player import get_players_page
 from API.Database.Crud.Mordhau.player import get_player_by_id
 from API.Database.Crud.Mordhau.player import get_player_by_discord_id
 from API.Database.Crud.Mordhau.player import get_player_by_name
@@ -26,10 +28,19 @@ from API.Database.Crud.Mordhau.player import get_player_by_playfab_id
 from API.Database.Crud.Mordhau.player import make_ambassador
 from API.Database.Crud.Mordhau.player import remove_ambassador
 from API.Database.Crud.Mordhau.player import update_player_name
+from API.Database.Crud.Mordhau.player import get_player_rating
+from API.Database.Crud.Mordhau.player import calculate_player_ratings
+from API.Database.Crud.Mordhau.player import get_player_stats
+from API.Database.Crud.Mordhau.player import backfill_player_stats
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import MAX_PAGE_SIZE
 
 from API.Schemas.Mordhau.player import Player
 from API.Schemas.Mordhau.player import PlayerInDB
+from API.Schemas.Mordhau.player import PlayerRatingInDB
+from API.Schemas.Mordhau.player import PlayerStats
 from API.Schemas import BaseSchema
+from API.Schemas import Page
 
 log = logging.getLogger(__name__)
 
@@ -44,6 +55,12 @@ class MordhauPlayer(BaseEndpoint):
     async def player():
         return await get_players()
 
+    @staticmethod
+    @route.get("/page", tags=tags, response_model=Page[PlayerInDB])
+    async def page(cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+                   limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+        return await get_players_page(cursor=cursor, limit=limit)
+
     @staticmethod
     @route.get("/id", tags=tags, response_model=PlayerInDB)
     async def _id(id: UUID4) -> [Player, dict]:
@@ -148,3 +165,28 @@ class MordhauPlayer(BaseEndpoint):
         await check_user(token=auth[0], user_id=auth[-1])
         player = await remove_ambassador(player_id)
         return BaseSchema(message=f"Removed player {player_id} from the ambassador role on team {player.team_id}")
+
+    @staticmethod
+    @route.get("/rating", tags=tags, response_model=PlayerRatingInDB)
+    async def rating(player_id: UUID4):
+        return await get_player_rating(player_id)
+
+    @staticmethod
+    @route.post("/calculate-ratings", tags=tags, response_model=BaseSchema)
+    async def calculate_ratings(auth=Depends(JWTBearer())):
+        await check_user(token=auth[0], user_id=auth[-1])
+        log.info(f"User id \"{auth[-1]}\" issued a calculation of every player rating")
+        return BaseSchema(message=f"Rated {await calculate_player_ratings()} players.")
+
+    @staticmethod
+    @route.get("/stats", tags=tags, response_model=PlayerStats)
+    async def stats(player_id: UUID4):
+        return await get_player_stats(player_id)
+
+    @staticmethod
+    @route.post("/backfill-stats", tags=tags, response_model=BaseSchema)
+    async def backfill_stats(auth=Depends(JWTBearer())):
+        await check_user(token=auth[0], user_id=auth[-1])
+        log.info(f"User id \"{auth[-1]}\" issued a backfill of every player's stats")
+        await backfill_player_stats()
+        return BaseSchema(message="Recalculated the stats of every player.")
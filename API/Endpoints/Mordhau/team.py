@@ -1,5 +1,9 @@
 import logging
 
+from typing import Optional
+from typing import Union
+from datetime import datetime
+
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import Query
@@ -12,6 +16,7 @@ from API.Database.Crud.User.user import check_user
 from API.Auth import JWTBearer
 
 from API.Database.Crud.Mordhau.team import get_teams
+from API.Database.Crud.Mordhau.team import get_teams_page
 from API.Database.Crud.Mordhau.team import remove_player_from_team
 from API.Database.Crud.Mordhau.team import add_player_to_team
 from API.Database.Crud.Mordhau.team import get_team_by_id
@@ -20,13 +25,23 @@ from API.Database.Crud.Mordhau.team import get_team_by_name
 from API.Database.Crud.Mordhau.team import create_team
 from API.Database.Crud.Mordhau.team import delete_team
 from API.Database.Crud.Mordhau.team import update_name
-from API.Database.Crud.Mordhau.team import update_elo
+from API.Database.Crud.Mordhau.team import get_leaderboard
+from API.Database.Crud.Mordhau.elo import override_elo
+from API.Database.Crud.Mordhau.elo import get_elo_at
+from API.Database.Crud.Mordhau.elo import get_elo_history
+from API.Database.Crud.pagination import DEFAULT_PAGE_SIZE
+from API.Database.Crud.pagination import MAX_PAGE_SIZE
 
 from API.Endpoints import BaseEndpoint
 
 from API.Schemas.Mordhau.team import Team
 from API.Schemas.Mordhau.team import TeamInDB
+from API.Schemas.Mordhau.team import BaseTeamInDB
+from API.Schemas.Mordhau.team import LeaderboardTeam
+from API.Schemas.Mordhau.elo import EloAt
+from API.Schemas.Mordhau.elo import EloLedgerInDB
 from API.Schemas import BaseSchema
+from API.Schemas import Page
 
 log = logging.getLogger(__name__)
 
@@ -37,11 +52,33 @@ class MordhauTeam(BaseEndpoint):
     route = APIRouter(prefix="/team")
 
     @staticmethod
-    @route.get("/all", tags=tags, response_model=list[TeamInDB])
-    async def team():
-        teams = await get_teams()
-        print(teams)
-        return teams
+    @route.get("/all", tags=tags, response_model=list[Union[TeamInDB, BaseTeamInDB]])
+    async def team(include_players: bool = Query(True, description="If the players of every team are included")):
+        return await get_teams(include_players=include_players)
+
+    @staticmethod
+    @route.get("/page", tags=tags, response_model=Union[Page[TeamInDB], Page[BaseTeamInDB]])
+    async def page(cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+                   limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                   include_players: bool = Query(True, description="If the players of every team are included")):
+        return await get_teams_page(cursor=cursor, limit=limit, include_players=include_players)
+
+    @staticmethod
+    @route.get("/leaderboard", tags=tags, response_model=list[LeaderboardTeam])
+    async def _leaderboard(offset: int = Query(0, ge=0), limit: int = Query(25, gt=0, le=100)):
+        return (await get_leaderboard()).page(offset, limit)
+
+    @staticmethod
+    @route.get("/rank", tags=tags, response_model=LeaderboardTeam)
+    async def rank(id: UUID4):
+        leaderboard = await get_leaderboard()
+        if id in leaderboard:
+            elo, team_name = leaderboard.teams[str(id)]
+            return LeaderboardTeam(rank=leaderboard.rank(id), id=id, team_name=team_name, elo=elo)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Team with id \"{id}\" not found"
+        )
 
     @staticmethod
     @route.get("/id", tags=tags, response_model=TeamInDB)
@@ -104,7 +141,19 @@ class MordhauTeam(BaseEndpoint):
         await check_user(token=auth[0], user_id=auth[-1])
         if team_id and await get_team_by_id(team_id):
             log.info(f"User id \"{auth[-1]}\" updated team_id \"{team_id}\" elo to {new_elo}")
-            return await update_elo(team_id, new_elo)
+            return await override_elo(team_id, new_elo)
+
+    @staticmethod
+    @route.get("/elo-at", tags=tags, response_model=EloAt)
+    async def elo_at(team_id: UUID4, at: datetime = Query(..., title="ISO 8601 Timestamp")):
+        return EloAt(team_id=team_id, at=at, elo=await get_elo_at(team_id, at))
+
+    @staticmethod
+    @route.get("/elo-history", tags=tags, response_model=list[EloLedgerInDB])
+    async def elo_history(team_id: UUID4,
+                          start_time: Optional[datetime] = Query(None, title="ISO 8601 Timestamp", Optional=True),
+                          end_time: Optional[datetime] = Query(None, title="ISO 8601 Timestamp", Optional=True)):
+        return await get_elo_history(team_id, start_time, end_time)
 
     @staticmethod
     @route.post("/add-player-to-team", tags=tags, response_model=TeamInDB)
@@ -1,6 +1,9 @@
+import datetime
+
 from typing import Optional
 from typing import Union
 from typing import List
+from typing import Dict
 
 from pydantic import Field
 from pydantic import UUID4
@@ -8,6 +11,7 @@ from pydantic import UUID4
 from API.Schemas import BaseInDB
 from API.Schemas import BaseSchema
 from API.Schemas.Mordhau.Game.set import SetInDB
+from API.Schemas.Mordhau.Game.set import IngestSet
 
 
 class BaseMatch(BaseSchema):
@@ -27,6 +31,126 @@ class Match(BaseMatch):
 
 class BaseMatchInDB(Match, BaseInDB):
     elo_calculated: bool
+    team1_rounds_won: int = 0
+    team2_rounds_won: int = 0
 
 class MatchInDB(BaseMatchInDB):
     sets: List[SetInDB]
+
+
+class IngestMatch(BaseMatch):
+    class Config:
+        schema_extra = {
+            "example": {
+                "team1_id": "uuid",
+                "team2_id": "uuid",
+                "sets": [
+                    {
+                        "map": "skm_moshpit",
+                        "rounds": [
+                            {
+                                "team1_win": True,
+                                "team2_win": False,
+                                "round_players": [
+                                    {
+                                        "player_id": "uuid",
+                                        "team_id": "uuid",
+                                        "team_number": 0,
+                                        "score": 0,
+                                        "kills": 0,
+                                        "deaths": 0,
+                                        "assists": 0
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        }
+
+    sets: List[IngestSet] = Field(..., min_items=1)
+
+
+class MatchPredictionTeams(BaseSchema):
+    team1_id: Union[UUID4, str, int] = Field(..., minlength=32, maxlength=36)
+    team2_id: Union[UUID4, str, int] = Field(..., minlength=32, maxlength=36)
+
+
+class MatchPredictionsTeams(BaseSchema):
+    class Config:
+        schema_extra = {
+            "example": {
+                "matches": [
+                    {
+                        "team1_id": "uuid",
+                        "team2_id": "uuid"
+                    }
+                ]
+            }
+        }
+
+    matches: List[MatchPredictionTeams]
+
+
+class MatchPrediction(MatchPredictionTeams):
+    team1_expected_score: float
+    team2_expected_score: float
+
+
+class HeadToHead(MatchPredictionTeams):
+    matches_played: int
+    team1_wins: int
+    team2_wins: int
+    # Matches where both teams won as many rounds, matches without any rounds won aren't counted
+    ties: int
+    team1_rounds_won: int
+    team2_rounds_won: int
+    # The elo the teams gained, negative if lost, over the elo calculated matches between them
+    team1_elo_change: int
+    team2_elo_change: int
+    last_played: Optional[datetime.datetime] = None
+
+
+class SimulateBracket(BaseSchema):
+    class Config:
+        schema_extra = {
+            "example": {
+                "team_ids": ["uuid", "uuid", "uuid", "uuid"],
+                "trials": 10000,
+                "seed": 1
+            }
+        }
+
+    team_ids: List[Union[UUID4, str, int]] = Field(..., min_items=2)
+    trials: int = Field(10000, gt=0, le=100000)
+    seed: Optional[int] = None
+    sets_to_win: int = Field(3, gt=0)
+    rounds_to_win: int = Field(7, gt=0)
+
+
+class SimulateSeason(BaseSchema):
+    class Config:
+        schema_extra = {
+            "example": {
+                "fixtures": [
+                    {
+                        "team1_id": "uuid",
+                        "team2_id": "uuid"
+                    }
+                ],
+                "trials": 10000,
+                "seed": 1
+            }
+        }
+
+    fixtures: List[MatchPredictionTeams] = Field(..., min_items=1)
+    trials: int = Field(10000, gt=0, le=100000)
+    seed: Optional[int] = None
+    sets_to_win: int = Field(3, gt=0)
+    rounds_to_win: int = Field(7, gt=0)
+
+
+class SimulationResult(BaseSchema):
+    trials: int
+    positions: Dict[str, Dict[str, float]]
@@ -87,3 +87,17 @@ class BaseRoundInDB(Round, BaseInDB):
 
 class RoundInDB(BaseRoundInDB):
     ...
+
+
+class IngestRoundPlayer(BaseRoundPlayer):
+    player_id: Union[UUID4, str, int] = Field(..., minlength=32, maxlength=36)
+    score: int
+    kills: int
+    deaths: int
+    assists: int
+
+
+class IngestRound(BaseSchema):
+    team1_win: bool
+    team2_win: bool
+    round_players: List[IngestRoundPlayer] = []
@@ -8,6 +8,7 @@ from pydantic import UUID4
 from API.Schemas import BaseInDB
 from API.Schemas import BaseSchema
 from API.Schemas.Mordhau.Game.round import RoundInDB
+from API.Schemas.Mordhau.Game.round import IngestRound
 
 
 class BaseSet(BaseSchema):
@@ -28,8 +29,36 @@ class Set(BaseSet):
 
 
 class BaseSetInDB(Set, BaseInDB):
+    team1_rounds_won: int = 0
+    team2_rounds_won: int = 0
     rounds: List[RoundInDB]
 
 
 class SetInDB(BaseSetInDB):
     ...
+
+
+class IngestSet(BaseSchema):
+    map: str
+    rounds: List[IngestRound] = []
+
+
+class TeamMapStats(BaseSchema):
+    team_id: Union[UUID4, str, int]
+    sets_played: int
+    sets_won: int
+    win_rate: float
+
+
+class MapStats(BaseSchema):
+    map: str
+    sets_played: int
+    teams: List[TeamMapStats]
+
+
+class MapMatrix(BaseSchema):
+    maps: List[str]
+    team_ids: List[Union[UUID4, str, int]]
+    # Indexed [team][map] in the order of team_ids and maps
+    sets_played: List[List[int]]
+    win_rates: List[List[Optional[float]]]
@@ -0,0 +1,28 @@
+from typing import Optional
+from typing import Union
+
+from datetime import datetime
+
+from pydantic import Field
+from pydantic import UUID4
+
+from API.Schemas import BaseInDB
+from API.Schemas import BaseSchema
+
+
+class BaseEloLedger(BaseSchema):
+    team_id: Union[UUID4, str, int] = Field(..., minlength=32, maxlength=36)
+    match_id: Optional[Union[UUID4, str, int]] = Field(None, minlength=32, maxlength=36)
+    elo_before: int
+    elo_after: int
+    delta: int
+
+
+class EloLedgerInDB(BaseEloLedger, BaseInDB):
+    ...
+
+
+class EloAt(BaseSchema):
+    team_id: Union[UUID4, str, int] = Field(..., minlength=32, maxlength=36)
+    at: datetime
+    elo: int
@@ -3,6 +3,7 @@ from typing import Union
 
 from pydantic import Field
 from pydantic import UUID4
+from pydantic import root_validator
 
 from API.Schemas import BaseInDB
 from API.Schemas import BaseSchema
@@ -33,3 +34,43 @@ class BasePlayerInDB(BasePlayer, BaseInDB):
 class PlayerInDB(BasePlayerInDB):
     team_id: Optional[Union[UUID4, str, int]] = Field(..., minlength=32, maxlength=36)
     ambassador: Optional[bool]
+
+
+class BasePlayerRating(BaseSchema):
+    player_id: Union[UUID4, str, int] = Field(..., minlength=32, maxlength=36)
+    rating: float
+    rounds_rated: int
+
+
+class PlayerRatingInDB(BasePlayerRating, BaseInDB):
+    ...
+
+
+class BasePlayerStats(BaseSchema):
+    player_id: Union[UUID4, str, int] = Field(..., minlength=32, maxlength=36)
+    rounds_played: int = 0
+    rounds_won: int = 0
+    score: int = 0
+    kills: int = 0
+    deaths: int = 0
+    assists: int = 0
+
+
+class PlayerStats(BasePlayerStats):
+    average_score: float = 0
+    average_kills: float = 0
+    average_deaths: float = 0
+    average_assists: float = 0
+    kill_death_ratio: float = 0
+    win_rate: float = 0
+
+    @root_validator(skip_on_failure=True)
+    def calculate_averages(cls, values):
+        if rounds_played := values["rounds_played"]:
+            for total in ("score", "kills", "deaths", "assists"):
+                values[f"average_{total}"] = values[total] / rounds_played
+            values["win_rate"] = values["rounds_won"] / rounds_played
+
+        # Without deaths the ratio is the amount of kills, like the in-game scoreboard
+        values["kill_death_ratio"] = values["kills"] / max(values["deaths"], 1)
+        return values
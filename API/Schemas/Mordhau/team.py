@@ -38,3 +38,10 @@ class BaseTeamInDB(Team, BaseInDB):
 
 class TeamInDB(BaseTeamInDB):
     players: List[PlayerInDB]
+
+
+class LeaderboardTeam(BaseSchema):
+    rank: int
+    id: Union[UUID4, str, int] = Field(..., minlength=32, maxlength=36)
+    team_name: str
+    elo: int
@@ -1,6 +1,8 @@
 from typing import Optional
 from typing import Union
 from typing import List
+from typing import Generic
+from typing import TypeVar
 
 from datetime import datetime
 from datetime import timezone
@@ -9,6 +11,7 @@ from pydantic import UUID4
 from pydantic import Field
 from pydantic import validator
 from pydantic import BaseModel
+from pydantic.generics import GenericModel
 
 
 class BaseSchema(BaseModel):
@@ -25,3 +28,12 @@ class BaseInDB(BaseSchema):
     id: Optional[Union[UUID4, str, int]] = Field(..., minlength=32, maxlength=36)
     creation: Optional[datetime]
     modification: Optional[datetime]
+
+
+ItemT = TypeVar("ItemT")
+
+
+class Page(BaseSchema, GenericModel, Generic[ItemT]):
+    items: List[ItemT]
+    next_cursor: Optional[str] = None
+    estimated_total: Optional[int] = None
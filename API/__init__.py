@@ -1,5 +1,9 @@
 import asyncio
+import contextlib
+import contextvars
+import inspect
 import os
+import time
 import logging
 import importlib
 import pkgutil
@@ -31,8 +35,32 @@ root_path = Path(__file__).parent
 config = Config(root_path.parent / ".env", environ=os.environ)
 
 
+class RequestScopeMiddleware:
+
+    def __init__(self, app):
+        """
+        Runs every HTTP request in its own loader scope, lookups made while handling it are batched and kept until
+        it's done, see API.Database.Crud.loader
+        """
+
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        from API.Database.Crud.loader import request_scope
+
+        with request_scope():
+            await self.app(scope, receive, send)
+
+
 class BaseApplication:
     app = fastapi.FastAPI(title="MFC Elo", default_response_class=ORJSONResponse)
+    app.add_middleware(RequestScopeMiddleware)
+
+    # Creates round partitions ahead of time while the API runs, see API.Database.partitions
+    partition_task: asyncio.Task = None
 
     def __init__(
             self,
@@ -47,34 +75,72 @@ class BaseApplication:
     @staticmethod
     @app.on_event("startup")
     async def startup() -> None:
-        for route in BaseApplication.app.routes:
-            if isinstance(route, Route):
-                log.info(f"Registered route: \"{route.path}\", methods: {route.methods}")
+        # Taken before any query, tasks started in it get a database connection of their own instead of sharing ours
+        context = contextvars.copy_context()
+        timings = {}
+
+        with _timed(timings, "routes"):
+            for route in BaseApplication.app.routes:
+                if isinstance(route, Route):
+                    log.info(f"Registered route: \"{route.path}\", methods: {route.methods}")
 
         from API.Database import BaseDB
 
-        await BaseDB.db.connect()
+        with _timed(timings, "connect"):
+            await BaseDB.db.connect()
+
+        with _timed(timings, "schema"):
+            fingerprint = BaseDB.schema_fingerprint()
+            if BaseDB.SCHEMA_FINGERPRINT and await BaseDB.schema_is_current(fingerprint):
+                log.info("Schema fingerprint matches the models, skipped creating and upgrading tables")
+            else:
+                BaseDB.sync_tables()
+                await BaseDB.store_schema_fingerprint(fingerprint)
+
+        from API.Database.partitions import PARTITION_ROUNDS
+        from API.Database.partitions import create_partitions
+        from API.Database.partitions import maintain_partitions
 
-        BaseDB.create_tables()
+        if PARTITION_ROUNDS:
+            with _timed(timings, "partitions"):
+                await create_partitions()
+            BaseApplication.partition_task = context.run(asyncio.create_task, maintain_partitions())
 
         from API.Schemas.User.user import UserCreate
         from API.Database.Crud.User.user import create_user
+        from API.Database.Crud.User.user import user_exists
 
-        admin_user = UserCreate(username="admin",
-                                password="Admin1234@")
+        with _timed(timings, "admin"):
+            # Hashing the password is most of the cost of create_user, it's only paid when the admin is missing
+            if not await user_exists("admin"):
+                admin_user = UserCreate(username="admin",
+                                        password="Admin1234@")
 
-        try:
-            await create_user(admin_user)
-        except HTTPException:
-            pass
+                try:
+                    await create_user(admin_user)
+                except HTTPException:
+                    pass
 
+        from API.Database.Crud.Mordhau.team import load_leaderboard
 
+        with _timed(timings, "leaderboard"):
+            await load_leaderboard()
+
+        log.info(
+            f"Started in {sum(timings.values()):.3f}s ("
+            + ", ".join(f"{phase}: {seconds:.3f}s" for phase, seconds in timings.items()) + ")"
+        )
 
     @staticmethod
     @app.on_event("shutdown")
     async def shutdown() -> None:
 
         from API.Database import BaseDB
+        from API.ELO.simulation import shutdown_executor
+
+        if BaseApplication.partition_task:
+            BaseApplication.partition_task.cancel()
+        shutdown_executor()
 
         await BaseDB.db.disconnect()
 
@@ -126,6 +192,15 @@ class BaseApplication:
         # loop.create_task(YOUR_APPLICATION) pior to loop.run_until_complete
 
 
+@contextlib.contextmanager
+def _timed(timings: dict[str, float], phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - start
+
+
 def find_subclasses(package: str = "API", recursive: bool = True) -> None:
     """ Import all submodules of a module, recursively, including subpackages
 
@@ -143,15 +218,46 @@ def find_subclasses(package: str = "API", recursive: bool = True) -> None:
             find_subclasses(full_name, recursive)
 
 
+def _init_parameters(cls) -> set[str]:
+    """
+    Returns:
+        The keyword arguments the class' __init__ takes, following **kwargs up to the base classes
+    """
+
+    parameters = set()
+    for base in cls.__mro__:
+        if (init := base.__dict__.get("__init__")) is None:
+            continue
+
+        init_parameters = inspect.signature(init).parameters.values()
+        parameters.update(
+            parameter.name for parameter in init_parameters
+            if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)
+        )
+        if not any(parameter.kind == parameter.VAR_KEYWORD for parameter in init_parameters):
+            break
+
+    parameters.discard("self")
+    return parameters
+
+
 def dynamic_env_load(instance: object, base_match: str, uninstantiated_object) -> dict:
     """
     Will load environment variables based on the arguments that are passed to an object.
     The arguments are found via instance_vars which should be passed in via vars(object()).
+    Variables of the instance that aren't arguments of uninstantiated_object are left out, which is found from its
+    signature instead of instantiating it.
     """
 
-    instance_vars = vars(instance)
+    instance_vars = dict(vars(instance))
+    parameters = _init_parameters(uninstantiated_object)
+
+    for var in list(instance_vars):
+        if var not in parameters:
+            log.warning(f"Removed kwarg \"{var}\" for object \"{uninstantiated_object}\"")
+            instance_vars.pop(var)
+            continue
 
-    for var in dict(instance_vars).keys():
         if env_var := config.get((base_match + var).upper(), default=None):
 
             try:
@@ -165,12 +271,6 @@ def dynamic_env_load(instance: object, base_match: str, uninstantiated_object) -
                 instance_vars[var] = None
             else:
                 instance_vars[var] = str(env_var)
-        try:
-            uninstantiated_object(**instance_vars)
-        except TypeError as error:
-            error_attr = str(error).split(" ")[-1].strip("'")
-            log.warning(f"Removed kwarg \"{error_attr}\" for object \"{uninstantiated_object}\"")
-            instance_vars.pop(error_attr)
 
     return instance_vars
 
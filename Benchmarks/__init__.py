@@ -0,0 +1,213 @@
+"""
+Benchmarks for the rating engine and the CRUD/serialization hot paths, see Benchmarks/__main__.py for usage.
+
+A benchmark is a function registered with @benchmark that does its setup and returns the callable to time, it's
+registered once for every combination of the parameter values given to the decorator. Benchmarks that need the
+database return a coroutine function instead and are only run with --database.
+"""
+
+import asyncio
+import datetime
+import importlib
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+from pathlib import Path
+
+BENCHMARK_MODULES = ("Benchmarks.elo", "Benchmarks.tree", "Benchmarks.serialization")
+
+
+class Benchmark:
+
+    def __init__(self, name: str, setup, params: dict, database: bool = False):
+        """
+        Args:
+            name: The name of the benchmark including its parameters, e.g. "elo.calculate_batch[matches=100]"
+            setup: Called with params, returns the callable to time
+            params: The parameters of this variant
+            database: If the benchmark needs a database connection
+        """
+
+        self.name = name
+        self.setup = setup
+        self.params = params
+        self.database = database
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, database: bool = False, **params: list):
+    """
+    Registers the decorated setup function once for every combination of the given parameter values
+    """
+
+    def register(setup):
+        for values in itertools.product(*params.values()):
+            variant = dict(zip(params, values))
+            variant_name = name
+            if variant:
+                variant_name += "[" + ",".join(f"{key}={value}" for key, value in variant.items()) + "]"
+            BENCHMARKS[variant_name] = Benchmark(variant_name, setup, variant, database=database)
+        return setup
+
+    return register
+
+
+def load_benchmarks() -> dict[str, Benchmark]:
+    for module in BENCHMARK_MODULES:
+        importlib.import_module(module)
+    return BENCHMARKS
+
+
+async def _time(function, number: int) -> float:
+    if asyncio.iscoroutinefunction(function):
+        start = time.perf_counter()
+        for _ in range(number):
+            await function()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return time.perf_counter() - start
+
+
+async def measure(function, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Times the function like timeit, every repeat calls it enough times to take at least min_time. Coroutine functions
+    are awaited.
+
+    Returns:
+        The amount of calls per repeat and the min, median, mean and stdev of a single call in seconds
+    """
+
+    number = 1
+    while (elapsed := await _time(function, number)) < min_time:
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+
+    timings = [elapsed / number] + [await _time(function, number) / number for _ in range(repeat - 1)]
+
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata() -> dict:
+    import numpy
+    import orjson
+    import pydantic
+
+    return {
+        "timestamp": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy.__version__,
+        "pydantic": pydantic.VERSION,
+        "orjson": orjson.__version__
+    }
+
+
+async def _run(benchmarks: list[Benchmark], repeat: int, min_time: float, log) -> dict:
+    results = {}
+
+    for bench in benchmarks:
+        if bench.database:
+            from API.Database import BaseDB
+
+            # Everything a database benchmark inserts is rolled back, the whole benchmark runs in this task so it
+            # stays on the transaction's connection
+            async with BaseDB.db.transaction(force_rollback=True):
+                result = await measure(await bench.setup(**bench.params), repeat=repeat, min_time=min_time)
+        else:
+            result = await measure(bench.setup(**bench.params), repeat=repeat, min_time=min_time)
+
+        results[bench.name] = {"params": bench.params, **result}
+        log(f"{bench.name:<60} {result['median'] * 1e6:>14.2f} us  (± {result['stdev'] * 1e6:.2f} us, "
+            f"{result['number']} x {result['repeat']})")
+
+    return results
+
+
+async def _run_with_database(benchmarks: list[Benchmark], repeat: int, min_time: float, log) -> dict:
+    from API.Database import BaseDB
+
+    await BaseDB.db.connect()
+    try:
+        return await _run(benchmarks, repeat, min_time, log)
+    finally:
+        await BaseDB.db.disconnect()
+
+
+def run(pattern: str = None, repeat: int = 5, min_time: float = 0.2, database: bool = False, log=print) -> dict:
+    """
+    Runs every registered benchmark whose name contains pattern
+
+    Returns:
+        A JSON serializable report with the run's metadata and the timings keyed by benchmark name
+    """
+
+    benchmarks = [
+        bench for bench in load_benchmarks().values()
+        if (not pattern or pattern in bench.name) and (database or not bench.database)
+    ]
+
+    if any(bench.database for bench in benchmarks):
+        results = asyncio.run(_run_with_database(benchmarks, repeat, min_time, log))
+    else:
+        results = asyncio.run(_run(benchmarks, repeat, min_time, log))
+
+    return {"metadata": metadata(), "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list[dict]:
+    """
+    Compares the median of every benchmark in both reports
+
+    Returns:
+        One dict per shared benchmark with the baseline and current median, their ratio and if it regressed by more
+        than threshold (0.1 is 10% slower)
+    """
+
+    comparison = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        ratio = result["median"] / baseline["results"][name]["median"]
+        comparison.append({
+            "name": name,
+            "baseline": baseline["results"][name]["median"],
+            "current": result["median"],
+            "ratio": ratio,
+            "regressed": ratio > 1 + threshold
+        })
+    return comparison
+
+
+def save(report: dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,61 @@
+"""
+Runs the benchmarks and compares their results over time.
+
+Usage:
+    python -m Benchmarks list
+    python -m Benchmarks run --output results/HEAD.json [--filter elo.] [--database]
+    python -m Benchmarks compare results/main.json results/HEAD.json --threshold 0.1
+
+Benchmarks marked as needing the database only run with --database, they connect with SQL_DB_URL and roll back
+everything they insert.
+"""
+
+import argparse
+import sys
+
+import Benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m Benchmarks", description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="List every benchmark")
+
+    run = commands.add_parser("run", help="Run the benchmarks")
+    run.add_argument("--filter", help="Only run benchmarks whose name contains this")
+    run.add_argument("--repeat", type=int, default=5, help="How many times every benchmark is timed")
+    run.add_argument("--min-time", type=float, default=0.2, help="The least seconds a single timing should take")
+    run.add_argument("--database", action="store_true", help="Also run the benchmarks that need the database")
+    run.add_argument("--output", help="Write the results to this JSON file")
+
+    compare = commands.add_parser("compare", help="Compare the medians of two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.1, help="How much slower counts as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name, bench in Benchmarks.load_benchmarks().items():
+            print(f"{name}{'  (database)' if bench.database else ''}")
+
+    elif args.command == "run":
+        report = Benchmarks.run(args.filter, repeat=args.repeat, min_time=args.min_time, database=args.database)
+        if args.output:
+            Benchmarks.save(report, args.output)
+
+    else:
+        comparison = Benchmarks.compare(
+            Benchmarks.load(args.baseline), Benchmarks.load(args.current), threshold=args.threshold
+        )
+        for result in comparison:
+            print(f"{result['name']:<60} {result['baseline'] * 1e6:>14.2f} us {result['current'] * 1e6:>14.2f} us "
+                  f"{result['ratio']:>7.2f}x{'  REGRESSED' if result['regressed'] else ''}")
+
+        if any(result["regressed"] for result in comparison):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
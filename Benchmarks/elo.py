@@ -0,0 +1,60 @@
+from API.ELO import ELO
+from API.ELO.replay import Replay
+from API.ELO.team import Team
+
+from Benchmarks import benchmark
+from Benchmarks import generators
+
+
+@benchmark("elo.calculate")
+def calculate():
+    elo = ELO()
+    team1 = Team(elo=1550, rounds_won=21)
+    team2 = Team(elo=1480, rounds_won=17)
+
+    return lambda: elo.calculate(team1, team2)
+
+
+@benchmark("elo.calculate_loop", matches=[100, 10000])
+def calculate_loop(matches: int):
+    """
+    Rates every match one at a time with calculate, the baseline for calculate_batch
+    """
+
+    elo = ELO()
+    data = generators.match_results(matches)
+    teams = [
+        (Team(elo=team1_elo, rounds_won=team1_rounds), Team(elo=team2_elo, rounds_won=team2_rounds))
+        for team1_elo, team2_elo, team1_rounds, team2_rounds in zip(
+            data["team1_elo"].tolist(), data["team2_elo"].tolist(),
+            data["team1_rounds"].tolist(), data["team2_rounds"].tolist()
+        )
+    ]
+
+    def run():
+        for team1, team2 in teams:
+            elo.calculate(team1, team2)
+
+    return run
+
+
+@benchmark("elo.calculate_batch", matches=[100, 10000, 1000000])
+def calculate_batch(matches: int):
+    elo = ELO()
+    data = generators.match_results(matches)
+
+    return lambda: elo.calculate_batch(data["team1_elo"], data["team2_elo"], data["team1_rounds"], data["team2_rounds"])
+
+
+@benchmark("elo.replay", matches=[1000, 100000], teams=[32, 1000])
+def replay(matches: int, teams: int):
+    """
+    Replays a match history in order, sequential dependencies between matches limit how much can be batched
+    """
+
+    data = generators.match_results(matches, teams=teams)
+
+    def run():
+        Replay().apply(data["team1_index"], data["team2_index"], data["team1_rounds"], data["team2_rounds"])
+
+    return run
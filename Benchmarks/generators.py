@@ -0,0 +1,172 @@
+"""
+Deterministic synthetic data, the same arguments and seed always give the same data. Rows are dicts shaped like the
+rows of their table.
+"""
+
+import datetime
+import random
+import uuid
+
+import numpy
+
+MAPS = ("skm_moshpit", "skm_contraband", "skm_camp", "skm_tourney", "skm_bridge", "skm_arena")
+
+START = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _row(rng: random.Random, creation: datetime.datetime) -> dict:
+    return {
+        "id": _uuid(rng),
+        "creation": creation,
+        "modification": None
+    }
+
+
+def match_results(matches: int, teams: int = 32, seed: int = 0) -> dict[str, numpy.ndarray]:
+    """
+    Returns:
+        The team indexes, elo and rounds won of both teams for every match, like Replay.apply takes them
+    """
+
+    rng = numpy.random.default_rng(seed)
+
+    team1_index = rng.integers(0, teams, matches)
+    team2_index = (team1_index + rng.integers(1, teams, matches)) % teams
+    team1_rounds = rng.integers(0, 22, matches)
+    team2_rounds = rng.integers(0, 22, matches)
+    # Ties aren't rated, move them off by a round
+    team2_rounds[team1_rounds == team2_rounds] += 1
+
+    return {
+        "team1_index": team1_index,
+        "team2_index": team2_index,
+        "team1_elo": rng.normal(1500, 150, matches).round(),
+        "team2_elo": rng.normal(1500, 150, matches).round(),
+        "team1_rounds": team1_rounds,
+        "team2_rounds": team2_rounds
+    }
+
+
+def teams(count: int, players_per_team: int = 6, seed: int = 0) -> list[dict]:
+    """
+    Returns:
+        Team rows, each with a "players" list of player rows like TeamInDB
+    """
+
+    rng = random.Random(seed)
+
+    result = []
+    for team_number in range(count):
+        team = {
+            **_row(rng, START + datetime.timedelta(minutes=team_number)),
+            "team_name": f"benchmark team {seed}-{team_number}",
+            "elo": int(rng.gauss(1500, 150)),
+            "discord_id": rng.getrandbits(63),
+            "ambassador": None
+        }
+        team["players"] = [
+            {
+                **_row(rng, team["creation"]),
+                "player_name": f"benchmark player {seed}-{team_number}-{player_number}",
+                "playfab_id": f"{rng.getrandbits(64):016X}",
+                "discord_id": rng.getrandbits(63),
+                "team_id": team["id"],
+                "ambassador": player_number == 0
+            }
+            for player_number in range(players_per_team)
+        ]
+        result.append(team)
+
+    return result
+
+
+def match_rows(
+        matches: int,
+        sets_per_match: int = 3,
+        rounds_per_set: int = 10,
+        players_per_team: int = 6,
+        seed: int = 0
+) -> dict[str, list[dict]]:
+    """
+    Returns:
+        The rows of every table a match tree is loaded from, keyed by "teams", "matches", "sets", "rounds" and
+        "round_players". Every team row has its player rows in "players".
+    """
+
+    rng = random.Random(seed)
+    team_rows = teams(max(2, min(matches * 2, 32)), players_per_team=players_per_team, seed=seed)
+
+    rows = {"teams": team_rows, "matches": [], "sets": [], "rounds": [], "round_players": []}
+
+    for match_number in range(matches):
+        creation = START + datetime.timedelta(hours=match_number)
+        team1, team2 = rng.sample(team_rows, 2)
+        match = {
+            **_row(rng, creation),
+            "team1_id": team1["id"],
+            "team2_id": team2["id"],
+            "elo_calculated": True
+        }
+        rows["matches"].append(match)
+
+        for _ in range(sets_per_match):
+            set = {**_row(rng, creation), "map": rng.choice(MAPS), "match_id": match["id"]}
+            rows["sets"].append(set)
+
+            for _ in range(rounds_per_set):
+                team1_win = rng.random() < 0.5
+                round = {
+                    **_row(rng, creation),
+                    "set_id": set["id"],
+                    "match_id": match["id"],
+                    "team1_win": team1_win,
+                    "team2_win": not team1_win
+                }
+                rows["rounds"].append(round)
+
+                for team_number, team in enumerate((team1, team2)):
+                    for player in team["players"]:
+                        rows["round_players"].append({
+                            **_row(rng, creation),
+                            "round_id": round["id"],
+                            "set_id": set["id"],
+                            "match_id": match["id"],
+                            "player_id": player["id"],
+                            "team_id": team["id"],
+                            "team_number": team_number,
+                            "score": rng.randrange(0, 2000),
+                            "kills": rng.randrange(0, 10),
+                            "deaths": rng.randrange(0, 10),
+                            "assists": rng.randrange(0, 10)
+                        })
+
+    return rows
+
+
+def match_trees(rows: dict[str, list[dict]]) -> list[dict]:
+    """
+    Nests match_rows into dicts shaped like MatchInDB
+    """
+
+    round_players = {}
+    for round_player in rows["round_players"]:
+        round_players.setdefault(round_player["round_id"], []).append(round_player)
+
+    rounds = {}
+    for round in rows["rounds"]:
+        players = round_players.get(round["id"], [])
+        rounds.setdefault(round["set_id"], []).append({
+            **round,
+            "team1_players": [player for player in players if player["team_number"] == 0],
+            "team2_players": [player for player in players if player["team_number"] != 0]
+        })
+
+    sets = {}
+    for set in rows["sets"]:
+        sets.setdefault(set["match_id"], []).append({**set, "rounds": rounds.get(set["id"], [])})
+
+    return [{**match, "sets": sets.get(match["id"], [])} for match in rows["matches"]]
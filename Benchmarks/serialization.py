@@ -0,0 +1,69 @@
+"""
+Validating and serializing lists of MatchInDB, TeamInDB and RoundInDB the ways a response can be built
+"""
+
+import orjson
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from pydantic import parse_obj_as
+
+from API.Schemas.Mordhau.Game.match import MatchInDB
+from API.Schemas.Mordhau.Game.round import RoundInDB
+from API.Schemas.Mordhau.team import TeamInDB
+
+from Benchmarks import benchmark
+from Benchmarks import generators
+
+SCHEMAS = ["match", "team", "round"]
+COUNTS = [1, 100, 1000]
+
+
+def _objects(schema: str, count: int) -> tuple[type, list[dict]]:
+    """
+    Returns:
+        The schema and count dicts to validate into it
+    """
+
+    if schema == "match":
+        return MatchInDB, generators.match_trees(generators.match_rows(count))
+    if schema == "team":
+        return TeamInDB, generators.teams(count)
+
+    rounds = generators.match_trees(generators.match_rows(-(-count // 30)))
+    return RoundInDB, [round for match in rounds for set in match["sets"] for round in set["rounds"]][:count]
+
+
+@benchmark("serialization.validate", schema=SCHEMAS, count=COUNTS)
+def validate(schema: str, count: int):
+    model, objects = _objects(schema, count)
+
+    return lambda: parse_obj_as(list[model], objects)
+
+
+@benchmark("serialization.pydantic_json", schema=SCHEMAS, count=COUNTS)
+def pydantic_json(schema: str, count: int):
+    model, objects = _objects(schema, count)
+    models = parse_obj_as(list[model], objects)
+
+    return lambda: [instance.json() for instance in models]
+
+
+@benchmark("serialization.orjson", schema=SCHEMAS, count=COUNTS)
+def orjson_dumps(schema: str, count: int):
+    model, objects = _objects(schema, count)
+    models = parse_obj_as(list[model], objects)
+
+    return lambda: orjson.dumps([instance.dict() for instance in models])
+
+
+@benchmark("serialization.response", schema=SCHEMAS, count=COUNTS)
+def response(schema: str, count: int):
+    """
+    What an endpoint returning the models costs after the handler: encoding them and rendering an ORJSONResponse
+    """
+
+    model, objects = _objects(schema, count)
+    models = parse_obj_as(list[model], objects)
+
+    return lambda: ORJSONResponse(jsonable_encoder(models)).body
@@ -0,0 +1,115 @@
+"""
+Building MatchInDB trees, from rows already in memory and through the CRUD loaders against the database
+"""
+
+from API.Schemas.Mordhau.Game.match import MatchInDB
+
+from Benchmarks import benchmark
+from Benchmarks import generators
+
+# (matches, sets per match, rounds per set)
+SIZES = ["1x1x1", "1x3x10", "10x3x10"]
+
+
+def _size(size: str) -> dict:
+    matches, sets_per_match, rounds_per_set = (int(part) for part in size.split("x"))
+    return {"matches": matches, "sets_per_match": sets_per_match, "rounds_per_set": rounds_per_set}
+
+
+@benchmark("tree.build", size=SIZES)
+def build(size: str):
+    """
+    Nests the rows and validates them into MatchInDB, the work the loaders do besides querying
+    """
+
+    rows = generators.match_rows(**_size(size))
+
+    return lambda: [MatchInDB(**match) for match in generators.match_trees(rows)]
+
+
+async def _insert_rows(rows: dict[str, list[dict]]) -> None:
+    from API.Database import BaseDB
+    from API.Database.Models.Mordhau.team import Team
+    from API.Database.Models.Mordhau.player import Player
+    from API.Database.Models.Mordhau.Game.match import Match
+    from API.Database.Models.Mordhau.Game.set import Set
+    from API.Database.Models.Mordhau.Game.round import Round
+    from API.Database.Models.Mordhau.Game.round import RoundPlayer
+
+    def values(table_rows: list[dict]) -> list[dict]:
+        # The modification column is keyed "Modification" and is left to the database anyway
+        return [
+            {key: value for key, value in row.items() if key not in ("modification", "players")}
+            for row in table_rows
+        ]
+
+    tables = (
+        (Team, rows["teams"]),
+        (Player, [player for team in rows["teams"] for player in team["players"]]),
+        (Match, rows["matches"]),
+        (Set, rows["sets"]),
+        (Round, rows["rounds"]),
+        (RoundPlayer, rows["round_players"])
+    )
+    for model, table_rows in tables:
+        # Stay well under the bind parameter limit of a single statement
+        for start in range(0, len(table_rows), 2000):
+            await BaseDB.db.execute(model.__table__.insert().values(values(table_rows[start:start + 2000])))
+
+
+@benchmark("tree.load_match", database=True, size=SIZES)
+async def load_match(size: str):
+    """
+    get_match_by_id of the first match
+    """
+
+    from API.Database.Crud.Mordhau.Game.match import get_match_by_id
+
+    rows = generators.match_rows(**_size(size))
+    await _insert_rows(rows)
+
+    match_id = rows["matches"][0]["id"]
+
+    async def run():
+        await get_match_by_id(match_id)
+
+    return run
+
+
+@benchmark("tree.load_matches", database=True, size=SIZES)
+async def load_matches(size: str):
+    """
+    get_matches over the time range of the inserted matches
+    """
+
+    from API.Database.Crud.Mordhau.Game.match import get_matches
+
+    rows = generators.match_rows(**_size(size))
+    await _insert_rows(rows)
+
+    start_time, end_time = rows["matches"][0]["creation"], rows["matches"][-1]["creation"]
+
+    async def run():
+        await get_matches(start_time, end_time)
+
+    return run
+
+
+@benchmark("tree.load_matches_json", database=True, size=SIZES)
+async def load_matches_json(size: str):
+    """
+    match_trees_json over the time range of the inserted matches, the /match/all passthrough
+    """
+
+    from API.Database.Crud.Mordhau.Game.tree import match_trees_json
+
+    rows = generators.match_rows(**_size(size))
+    await _insert_rows(rows)
+
+    start_time, end_time = rows["matches"][0]["creation"], rows["matches"][-1]["creation"]
+
+    async def run():
+        async for _ in match_trees_json(start_time, end_time):
+            pass
+
+    return run